@@ -0,0 +1,101 @@
+import math
+import random
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+
+# Сколько секунд один воркер может держать пересчёт значения.
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+# Во сколько раз запись живёт в кеше дольше логического срока,
+# чтобы её можно было отдать, пока идёт пересчёт.
+STALE_FACTOR = 2
+
+
+def generation_key(name):
+    return f'generation:{name}'
+
+
+def new_generation():
+    # Поколение от времени не совпадёт с вытесненным из кеша старым.
+    return int(time.time() * 1000)
+
+
+def generation(name, backend=None):
+    """Текущее поколение данных name, входит в ключи кеша фрагментов."""
+    backend = backend or cache
+    return backend.get_or_set(generation_key(name), new_generation, None)
+
+
+def generation_time(name):
+    """Когда поколение name сменилось в последний раз (для Last-Modified)."""
+    return datetime.fromtimestamp(generation(name) / 1000, timezone.utc)
+
+
+def bump_generation(name, backend=None):
+    """Делает устаревшими все ключи, построенные на поколении name.
+
+    Новое поколение — время сдвига, но всегда больше прежнего.
+    """
+    backend = backend or cache
+    key = generation_key(name)
+    backend.set(
+        key, max(new_generation(), (backend.get(key) or 0) + 1), None
+    )
+
+
+def fetch(key, recompute, timeout, beta=1.0, backend=None):
+    """Значение из кеша с защитой от «набегов» при его истечении.
+
+    Пересчёт начинается заранее с вероятностью, растущей к концу срока
+    (XFetch, beta > 1 пересчитывает раньше). Пересчитывает только
+    получивший блокировку, остальные в это время отдают старое значение;
+    для этого запись хранится в кеше дольше своего логического срока.
+    """
+    backend = backend or cache
+    entry = backend.get(key)
+    if entry is not None:
+        value, delta, expiry = entry
+        early = delta * beta * math.log(1 - random.random())
+        if time.time() - early < expiry:
+            return value
+    if not backend.add(f'{key}:lock', True, LOCK_TIMEOUT):
+        if entry is not None:
+            return entry[0]
+        return wait_for(key, backend, recompute)
+    try:
+        start = time.time()
+        value = recompute()
+        delta = time.time() - start
+        backend.set(
+            key, (value, delta, time.time() + timeout), timeout * STALE_FACTOR
+        )
+    finally:
+        backend.delete(f'{key}:lock')
+    return value
+
+
+def wait_for(key, backend, recompute):
+    """Ждёт значение от пересчитывающего воркера, потом считает сам."""
+    deadline = time.time() + LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = backend.get(key)
+        if entry is not None:
+            return entry[0]
+    return recompute()
+
+
+class PersistentFileBasedCache(FileBasedCache):
+    """Файловый кеш без вытеснения записей.
+
+    FileBasedCache перед каждой записью перечисляет весь каталог, чтобы
+    решить, не пора ли вытеснять; здесь запись стоит одного файла.
+    get_many читает по файлу на ключ, поэтому кеш годится для данных,
+    которые процесс ещё держит в памяти.
+    """
+
+    def _cull(self):
+        pass
@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.views.decorators.http import condition
+
+from core.cache import generation, generation_time
+
+HOLE_PATTERN = re.compile(r'<!--hole:([A-Za-z0-9_=-]+)-->')
+
+
+def hole_marker(template_name, context):
+    """Метка на месте персональной части страницы."""
+    data = json.dumps([template_name, context]).encode()
+    return f'<!--hole:{base64.urlsafe_b64encode(data).decode()}-->'
+
+
+def render_hole(template_name, context, request):
+    return render_to_string(template_name, context, request=request)
+
+
+def fill_holes(content, request):
+    """Подставляет в общую часть страницы персональные фрагменты."""
+    def fill(match):
+        template_name, context = json.loads(
+            base64.urlsafe_b64decode(match.group(1))
+        )
+        return render_hole(template_name, context, request)
+    return HOLE_PATTERN.sub(fill, content)
+
+
+def versions(generations, view_kwargs):
+    """Текущие поколения; в именах подставляются аргументы view."""
+    return ':'.join(
+        str(generation(name.format(**view_kwargs))) for name in generations
+    )
+
+
+def viewer_kwargs(request, view_kwargs):
+    return dict(view_kwargs, viewer=request.user.get_username())
+
+
+def page_key(request, generations, view_kwargs):
+    version = versions(generations, view_kwargs)
+    return f'page:{request.get_full_path()}:{version}'
+
+
+def validity_start():
+    """Начало текущего окна PAGE_CACHE_TIMEOUT или None с общим кешем.
+
+    Поколения в LocMemCache у каждого процесса свои, и запись в другом
+    процессе их не сдвигает. Поэтому без общего кеша ETag и
+    Last-Modified, как и кеш страниц, живут не дольше PAGE_CACHE_TIMEOUT.
+    """
+    if settings.SHARED_CACHE:
+        return None
+    timeout = settings.PAGE_CACHE_TIMEOUT
+    return int(time.time() // timeout * timeout)
+
+
+def page_etag(*generations):
+    """etag_func для django.views.decorators.http.condition.
+
+    Страница меняется вместе с поколениями и, из-за персональных
+    фрагментов, с пользователем, поэтому тело рисовать не нужно.
+    Кроме аргументов view в именах поколений доступен {viewer} —
+    имя текущего пользователя.
+    """
+    def etag(request, *args, **kwargs):
+        version = versions(generations, viewer_kwargs(request, kwargs))
+        version = (
+            f'{request.get_full_path()}:{request.user.pk}:{version}:'
+            f'{validity_start()}'
+        )
+        return hashlib.md5(version.encode()).hexdigest()
+    return etag
+
+
+def page_modified(*generations):
+    """last_modified_func для condition: когда последний раз сдвигалось
+    любое из поколений страницы — тех же, что и в page_etag.
+    """
+    def last_modified(request, *args, **kwargs):
+        names = viewer_kwargs(request, kwargs)
+        times = [
+            generation_time(name.format(**names)) for name in generations
+        ]
+        start = validity_start()
+        if start is not None:
+            times.append(datetime.fromtimestamp(start, timezone.utc))
+        return max(times)
+    return last_modified
+
+
+def page_condition(*generations):
+    """condition с ETag и Last-Modified по поколениям страницы: оба
+    меняются при любых правках, удалениях и подписках, а считаются без
+    запросов к базе.
+    """
+    return condition(page_etag(*generations), page_modified(*generations))
+
+
+def cache_page_with_holes(timeout, *generations):
+    """Кеширует общую для всех часть страницы, а персональные фрагменты
+    ({% hole %}) дорисовывает при каждом ответе.
+
+    Ключ страницы содержит поколения generations; в их именах можно
+    подставлять аргументы представления: 'comments:{post_id}'.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            key = page_key(request, generations, kwargs)
+            page = cache.get(key)
+            if page is None:
+                # страницы ошибок рисуются вне view и меток не содержат
+                request.punch_holes = True
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    request.punch_holes = False
+                if response.streaming:
+                    return response
+                page = (
+                    response.content.decode(response.charset),
+                    response['Content-Type'],
+                )
+                if response.status_code != 200:
+                    response.content = fill_holes(page[0], request)
+                    return response
+                cache.set(key, page, timeout)
+            content, content_type = page
+            return HttpResponse(
+                fill_holes(content, request), content_type=content_type
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,57 @@
+"""Плагин pytest: тест падает или предупреждает, если view, которую он
+вызвал, вышла из бюджета запросов QUERY_BUDGETS; файловые кеши на время
+тестов переносятся во временный каталог.
+
+Подключается через pytest_plugins в conftest.py, режим задаётся
+опцией --query-budget=fail|warn|off.
+"""
+import warnings
+
+import pytest
+
+
+class QueryBudgetWarning(UserWarning):
+    pass
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--query-budget',
+        choices=('fail', 'warn', 'off'),
+        default='fail',
+        help='что делать, если view превысила бюджет запросов'
+    )
+
+
+@pytest.fixture(scope='session', autouse=True)
+def file_caches():
+    from core.testing import temporary_file_caches
+
+    with temporary_file_caches():
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    mode = item.config.getoption('query_budget')
+    if mode == 'off':
+        yield
+        return
+    from core.query_budget import budget_exceeded
+
+    exceeded = []
+
+    def collect(sender, view_name, problems, **kwargs):
+        exceeded.append(f'{view_name}: ' + '; '.join(problems))
+
+    budget_exceeded.connect(collect, weak=False)
+    try:
+        yield
+    finally:
+        budget_exceeded.disconnect(collect)
+    if not exceeded:
+        return
+    message = 'Бюджет запросов превышен:\n' + '\n'.join(exceeded)
+    if mode == 'fail':
+        pytest.fail(message, pytrace=False)
+    warnings.warn(QueryBudgetWarning(message))
@@ -0,0 +1,83 @@
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+# отправляется, когда view вышла из бюджета; problems — описания нарушений
+budget_exceeded = Signal(providing_args=['view_name', 'problems'])
+
+PARAMS_PATTERN = re.compile(r'\bIN \((?:%s, )*%s\)')
+NUMBER_PATTERN = re.compile(r'\b\d+\b')
+
+
+def query_shape(sql):
+    """Запрос без параметров: списки IN и числа (LIMIT) сворачиваются."""
+    return NUMBER_PATTERN.sub('?', PARAMS_PATTERN.sub('IN (...)', sql))
+
+
+class QueryReport:
+    """Запросы одного ответа, сгруппированные по форме."""
+
+    def __init__(self):
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[query_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.shapes.values())
+
+    def repeated(self, limit):
+        """Формы, повторённые limit раз и больше: признак N+1."""
+        return {
+            shape: times for shape, times in self.shapes.items()
+            if times >= limit
+        }
+
+    def problems(self, budget, repeat_limit):
+        problems = []
+        if self.count > budget:
+            problems.append(f'{self.count} запросов при бюджете {budget}')
+        for shape, times in self.repeated(repeat_limit).items():
+            problems.append(f'{times} раз: {shape}')
+        return problems
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы view из QUERY_BUDGETS и сообщает, если их больше
+    бюджета или одна форма запроса повторяется (N+1).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        report = QueryReport()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(report))
+            response = self.get_response(request)
+        match = request.resolver_match
+        budget = match and settings.QUERY_BUDGETS.get(match.view_name)
+        if budget is not None:
+            self.check(match.view_name, report, budget)
+        return response
+
+    def check(self, view_name, report, budget):
+        problems = report.problems(budget, settings.QUERY_REPEAT_LIMIT)
+        if not problems:
+            return
+        logger.warning(
+            'Бюджет запросов %s превышен:\n%s', view_name, '\n'.join(problems)
+        )
+        budget_exceeded.send(
+            sender=self.__class__, view_name=view_name, problems=problems
+        )
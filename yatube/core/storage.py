@@ -0,0 +1,55 @@
+import fcntl
+import hashlib
+import os
+import re
+from contextlib import contextmanager
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# имена, построенные по содержимому: sha256 загрузок и md5-ключи
+# миниатюр sorl (с суффиксом @2x у альтернативных разрешений)
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{32,64}(@[\d.]+x)?\.\w+$')
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME.search(name))
+
+
+@deconstructible
+class HashedFileSystemStorage(FileSystemStorage):
+    """Хранит файл под sha256 его содержимого в каталоге исходного имени.
+
+    Одинаковые загрузки записываются один раз, а содержимое по URL файла
+    никогда не меняется, поэтому его можно кешировать навсегда.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, f'{digest.hexdigest()}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    @contextmanager
+    def lock(self):
+        """Блокировка хранилища, общая для всех процессов: проверка ссылок
+        на файл и его удаление или восстановление не перемежаются.
+        """
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, '.lock'), 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            yield
@@ -0,0 +1,23 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.page_cache import hole_marker, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **kwargs):
+    """Персональная часть страницы.
+
+    {% hole 'template.html' [key=value ..] %}
+
+    Под cache_page_with_holes выводит метку, которую заполняют при
+    каждом ответе, иначе сразу рисует шаблон. Шаблону доступны только
+    переданные значения (они должны сериализоваться в JSON) и данные
+    запроса: request, user, csrf_token.
+    """
+    request = context.get('request')
+    if getattr(request, 'punch_holes', False):
+        return mark_safe(hole_marker(template_name, kwargs))
+    return render_hole(template_name, kwargs, request)
@@ -0,0 +1,60 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache import fetch
+
+register = template.Library()
+
+
+class XCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time, fragment_name, vary_on,
+                 cache_name):
+        self.nodelist = nodelist
+        self.expire_time = expire_time
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.cache_name = cache_name
+
+    def get_backend(self, context):
+        if self.cache_name:
+            return caches[self.cache_name.resolve(context)]
+        try:
+            return caches['template_fragments']
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def render(self, context):
+        expire_time = int(self.expire_time.resolve(context))
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return fetch(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+            backend=self.get_backend(context)
+        )
+
+
+@register.tag
+def xcache(parser, token):
+    """Как {% cache %}, но с защитой от одновременного пересчёта.
+
+    {% xcache [expire_time] [fragment_name] [var1] .. [using="name"] %}
+    """
+    nodelist = parser.parse(('endxcache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.'
+        )
+    cache_name = None
+    if len(tokens) > 3 and tokens[-1].startswith('using='):
+        cache_name = parser.compile_filter(tokens.pop()[len('using='):])
+    return XCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(t) for t in tokens[3:]],
+        cache_name,
+    )
@@ -0,0 +1,45 @@
+"""Окружение тестов: файловые кеши переносятся во временный каталог,
+чтобы тесты не читали и не стирали кеши работающего сайта.
+
+Для manage.py test подключается через TEST_RUNNER, для pytest — фикстурой
+из core.pytest_plugin.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.utils.module_loading import import_string
+
+
+@contextmanager
+def temporary_file_caches():
+    directory = tempfile.mkdtemp()
+    caches = {
+        alias: (
+            dict(config, LOCATION=os.path.join(directory, alias))
+            if issubclass(import_string(config['BACKEND']), FileBasedCache)
+            else config
+        )
+        for alias, config in settings.CACHES.items()
+    }
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.file_caches = ExitStack()
+        self.file_caches.enter_context(temporary_file_caches())
+
+    def teardown_test_environment(self, **kwargs):
+        self.file_caches.close()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,142 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import ResolverMatch
+
+from core.cache import bump_generation, fetch, generation
+from core.query_budget import (
+    QueryBudgetMiddleware, budget_exceeded, query_shape
+)
+from core.storage import HashedFileSystemStorage
+from core.views import serve_media
+
+
+class FetchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.recompute = mock.Mock(return_value='новое')
+
+    def test_fresh_value_is_not_recomputed(self):
+        """Свежее значение отдаётся из кеша без пересчёта"""
+        cache.set('key', ('старое', 0.01, time.time() + 60), 120)
+        self.assertEqual(fetch('key', self.recompute, 60), 'старое')
+        self.recompute.assert_not_called()
+
+    def test_stale_value_served_while_locked(self):
+        """Пока другой воркер пересчитывает, отдаётся устаревшее значение"""
+        cache.set('key', ('старое', 0.01, time.time() - 1), 120)
+        cache.add('key:lock', True)
+        self.assertEqual(fetch('key', self.recompute, 60), 'старое')
+        self.recompute.assert_not_called()
+
+    def test_early_recompute(self):
+        """При большом beta значение пересчитывается до истечения срока"""
+        cache.set('key', ('старое', 1, time.time() + 1), 120)
+        with mock.patch('core.cache.random.random', return_value=0.5):
+            self.assertEqual(
+                fetch('key', self.recompute, 60, beta=1000), 'новое'
+            )
+        self.assertIsNone(cache.get('key:lock'))
+
+    def test_bump_generation(self):
+        """Сдвиг поколения меняет его значение"""
+        before = generation('test')
+        bump_generation('test')
+        self.assertNotEqual(generation('test'), before)
+
+
+class FileCacheTests(TestCase):
+    def test_tests_use_temporary_location(self):
+        """Файловые кеши в тестах лежат вне каталога проекта"""
+        location = caches['thumbnails']._dir
+        self.assertFalse(location.startswith(settings.BASE_DIR))
+
+    def test_set_does_not_list_directory(self):
+        """Запись в кеш без вытеснения не перечисляет каталог"""
+        backend = caches['thumbnails']
+        with mock.patch.object(backend, '_list_cache_files') as list_files:
+            backend.set('key', 'value')
+        list_files.assert_not_called()
+        self.assertEqual(backend.get('key'), 'value')
+
+
+class HashedStorageTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.storage = HashedFileSystemStorage(location=self.location)
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковое содержимое сохраняется в один файл"""
+        first = self.storage.save('posts/a.GIF', ContentFile(b'data'))
+        second = self.storage.save('posts/b.gif', ContentFile(b'data'))
+        other = self.storage.save('posts/c.gif', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith('posts/'))
+        self.assertTrue(first.endswith('.gif'))
+
+    def test_hashed_files_served_immutable(self):
+        """Файлы с хешем в имени отдаются с бессрочным кешированием"""
+        name = self.storage.save('posts/a.gif', ContentFile(b'data'))
+        with open(self.storage.path('posts/plain.gif'), 'wb') as file:
+            file.write(b'data')
+        request = RequestFactory().get('/')
+        response = serve_media(request, name, self.location)
+        self.assertIn('immutable', response['Cache-Control'])
+        response = serve_media(request, 'posts/plain.gif', self.location)
+        self.assertNotIn('Cache-Control', response)
+
+
+@override_settings(QUERY_BUDGETS={'test:view': 3}, QUERY_REPEAT_LIMIT=3)
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.exceeded = []
+        budget_exceeded.connect(self.collect)
+        self.addCleanup(budget_exceeded.disconnect, self.collect)
+
+    def collect(self, sender, view_name, problems, **kwargs):
+        self.exceeded.append((view_name, problems))
+
+    def run_view(self, queries, view_name='test:view'):
+        def view(request):
+            request.resolver_match = ResolverMatch(
+                view, (), {}, url_name=view_name.split(':')[1],
+                namespaces=[view_name.split(':')[0]]
+            )
+            for pk in queries:
+                list(get_user_model().objects.filter(pk__in=pk))
+        QueryBudgetMiddleware(view)(RequestFactory().get('/'))
+
+    def test_query_shape(self):
+        """Формы запросов не зависят от параметров и длины IN."""
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21'),
+            'SELECT * FROM t WHERE id IN (...) LIMIT ?'
+        )
+
+    def test_within_budget(self):
+        self.run_view([[1], [2, 3]])
+        self.assertEqual(self.exceeded, [])
+
+    def test_repeated_queries_reported(self):
+        """Один запрос с разными параметрами три раза — это N+1."""
+        self.run_view([[1], [2, 3], [4]])
+        [(view_name, problems)] = self.exceeded
+        self.assertEqual(view_name, 'test:view')
+        self.assertIn('3 раз', problems[0])
+
+    def test_budget_exceeded(self):
+        self.run_view([[1], [2], [3], [4]])
+        self.assertIn('4 запросов при бюджете 3', self.exceeded[0][1][0])
+
+    def test_other_views_ignored(self):
+        self.run_view([[1], [2], [3], [4]], view_name='test:other')
+        self.assertEqual(self.exceeded, [])
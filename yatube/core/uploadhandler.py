@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку сразу во временный файл, а после UPLOAD_MAX_SIZE
+    байт перестаёт её сохранять: ни память, ни диск воркера не растут.
+
+    У отвергнутого файла заполнен rejection — причина для формы.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.rejection = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.rejection is None:
+            if self.received > settings.UPLOAD_MAX_SIZE:
+                limit = filesizeformat(settings.UPLOAD_MAX_SIZE)
+                self.rejection = f'Файл больше {limit}.'
+                self.file.seek(0)
+                self.file.truncate()
+            else:
+                self.file.write(raw_data)
+        # остаток отвергнутого файла дочитывается из запроса и отбрасывается
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.rejection = self.rejection
+        return file
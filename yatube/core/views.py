@@ -1,4 +1,10 @@
 from django.shortcuts import render
+from django.views.static import serve
+
+from .storage import is_hashed
+
+# год — предел, который понимают браузеры и прокси
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
 
 
 def page_not_found(request, exception):
@@ -15,3 +21,15 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """static.serve, разрешающий кешировать навсегда файлы с
+    хешем содержимого в имени.
+    """
+    response = serve(request, path, document_root, show_indexes)
+    if response.status_code == 200 and is_hashed(path):
+        response['Cache-Control'] = (
+            f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        )
+    return response
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Follow, Group, Post, Comment
+from .models import Follow, Group, Post, Comment, Tag
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -33,3 +33,4 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow)
+admin.site.register(Tag)
@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from django.conf import settings
+        from PIL import Image
+
+        from . import checks, signals  # noqa: F401
+
+        # картинки больше лимита Pillow считает бомбой и не раскрывает
+        Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
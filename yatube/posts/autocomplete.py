@@ -0,0 +1,158 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.urls import reverse
+
+from core.cache import bump_generation, generation
+
+from .models import Group, User
+
+GENERATION = 'autocomplete'
+
+
+class PrefixIndex:
+    """Отсортированный массив пар (терм, ключ записи) для поиска по
+    префиксу бисекцией: O(log n) до первого совпадения.
+    """
+
+    def __init__(self):
+        self.terms = []
+        self.items = {}
+        self.generation = None
+        self.loaded = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, key, terms, item):
+        with self.lock:
+            self._remove(key)
+            terms = normalized(terms)
+            self.items[key] = (terms, item)
+            for term in terms:
+                insort(self.terms, (term, key))
+
+    def extend(self, entries):
+        """Добавляет записи с новыми ключами разом: массив сортируется
+        один раз вместо вставки каждого терма.
+        """
+        with self.lock:
+            for key, terms, item in entries:
+                terms = normalized(terms)
+                self.items[key] = (terms, item)
+                self.terms.extend((term, key) for term in terms)
+            self.terms.sort()
+
+    def remove(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        terms, _ = self.items.pop(key, (set(), None))
+        for term in terms:
+            position = bisect_left(self.terms, (term, key))
+            del self.terms[position]
+
+    def search(self, prefix, limit):
+        """Записи, у которых какой-нибудь терм начинается с prefix."""
+        prefix = prefix.casefold()
+        found = {}
+        with self.lock:
+            position = bisect_left(self.terms, (prefix,))
+            while position < len(self.terms) and len(found) < limit:
+                term, key = self.terms[position]
+                if not term.startswith(prefix):
+                    break
+                found.setdefault(key, self.items[key][1])
+                position += 1
+        return list(found.values())
+
+
+def normalized(terms):
+    return {term.casefold() for term in terms if term}
+
+
+index = PrefixIndex()
+
+
+def user_entry(pk, username):
+    return ('user', pk), [username], {
+        'type': 'user',
+        'value': username,
+        'url': reverse('posts:profile', args=[username]),
+    }
+
+
+def group_entry(pk, slug, title):
+    return ('group', pk), [slug, title, *title.split()], {
+        'type': 'group',
+        'value': slug,
+        'label': title,
+        'url': reverse('posts:group_list', args=[slug]),
+    }
+
+
+def load():
+    """Строит индекс заново по базе."""
+    fresh = PrefixIndex()
+    fresh.extend(
+        user_entry(*row) for row in User.objects.values_list('pk', 'username')
+    )
+    fresh.extend(
+        group_entry(*row)
+        for row in Group.objects.values_list('pk', 'slug', 'title')
+    )
+    return fresh
+
+
+def get_index():
+    """Индекс процесса; перестраивается, если другой процесс изменил
+    пользователей или группы (поколение в кеше сдвинулось), и в любом
+    случае раз в AUTOCOMPLETE_MAX_AGE секунд: поколение видно другим
+    процессам только в общем кеше.
+    """
+    global index
+    current = generation(GENERATION)
+    age = time.monotonic() - index.loaded
+    if index.generation != current or age >= settings.AUTOCOMPLETE_MAX_AGE:
+        index = load()
+        index.generation = current
+    return index
+
+
+def update(change):
+    """Вносит изменение в индекс процесса и сдвигает поколение, чтобы
+    индексы других процессов перестроились.
+    """
+    up_to_date = (
+        index.generation is not None
+        and index.generation == generation(GENERATION)
+    )
+    change(index)
+    bump_generation(GENERATION)
+    if up_to_date:
+        index.generation = generation(GENERATION)
+
+
+def user_saved(user):
+    update(lambda index: index.add(*user_entry(user.pk, user.username)))
+
+
+def user_deleted(user):
+    update(lambda index: index.remove(('user', user.pk)))
+
+
+def group_saved(group):
+    update(lambda index: index.add(
+        *group_entry(group.pk, group.slug, group.title)
+    ))
+
+
+def group_deleted(group):
+    update(lambda index: index.remove(('group', group.pk)))
+
+
+def suggest(prefix):
+    if not prefix:
+        return []
+    return get_index().search(prefix, settings.AUTOCOMPLETE_LIMIT)
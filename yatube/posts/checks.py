@@ -0,0 +1,18 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connection
+
+from . import triggers
+
+
+@register(Tags.database)
+def triggers_check(app_configs, **kwargs):
+    """Все триггеры из posts.triggers есть в базе."""
+    return [
+        Warning(
+            f'В базе нет триггера {name}.',
+            hint='Миграция, пересоздавшая таблицу, должна заканчиваться '
+                 'posts.triggers.restore() для неё.',
+            id='posts.W001',
+        )
+        for name in triggers.missing(connection)
+    ]
@@ -0,0 +1,74 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import (
+    Comment, Follow, Group, Post, Profile, Tag, TaggedPost, User
+)
+
+
+def shifted(field, delta):
+    # разошедшийся с данными счётчик не уходит ниже нуля: иначе CHECK
+    # положительного поля сорвал бы удаление поста или комментария
+    if delta < 0:
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+def bump(queryset, **deltas):
+    """Атомарно сдвигает счётчики: UPDATE ... SET f = f + delta."""
+    return queryset.update(
+        **{field: shifted(field, delta) for field, delta in deltas.items()}
+    )
+
+
+def bump_profile(user_id, **deltas):
+    """Сдвигает счётчики пользователя, создавая профиль при его отсутствии."""
+    if not bump(Profile.objects.filter(user_id=user_id), **deltas):
+        Profile.objects.get_or_create(user_id=user_id)
+        rebuild(
+            profiles=Profile.objects.filter(user_id=user_id),
+            groups=Group.objects.none(),
+            posts=Post.objects.none(),
+            tags=Tag.objects.none()
+        )
+
+
+def bump_group(group_id, **deltas):
+    if group_id is not None:
+        bump(Group.objects.filter(pk=group_id), **deltas)
+
+
+def count_of(queryset, field, outer='pk'):
+    """Подзапрос с числом строк queryset, у которых field равно outer."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def rebuild(profiles=None, groups=None, posts=None, tags=None):
+    """Пересчитывает счётчики по данным; None означает «все записи»."""
+    if profiles is None:
+        Profile.objects.bulk_create(
+            [Profile(user=user) for user in User.objects.filter(
+                profile__isnull=True
+            )],
+            ignore_conflicts=True
+        )
+        profiles = Profile.objects.all()
+    profiles.update(
+        post_count=count_of(Post.objects.all(), 'author', 'user_id'),
+        comment_count=count_of(Comment.objects.all(), 'author', 'user_id'),
+        follower_count=count_of(Follow.objects.all(), 'author', 'user_id'),
+        following_count=count_of(Follow.objects.all(), 'user', 'user_id'),
+    )
+    (Group.objects.all() if groups is None else groups).update(
+        post_count=count_of(Post.objects.all(), 'group')
+    )
+    (Post.objects.all() if posts is None else posts).update(
+        comment_count=count_of(Comment.objects.all(), 'post')
+    )
+    (Tag.objects.all() if tags is None else tags).update(
+        post_count=count_of(TaggedPost.objects.all(), 'tag')
+    )
@@ -0,0 +1,203 @@
+import heapq
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from .models import Follow, Post, Profile, Timeline
+from .utils import KEYSET_FIELDS, keyset_window
+
+# Сколько строк ленты вставлять за один запрос.
+FEED_BATCH_SIZE = 500
+
+post_key = attrgetter('pub_date', 'pk')
+
+
+def post_keys(posts):
+    """Только ключи постов для пагинации; догружает их loader.
+
+    posts берутся не из связанного менеджера (group.posts): тот
+    подставляет владельца в каждый пост и так читает отложенные поля.
+    """
+    return posts.only('pub_date')
+
+
+def entry_keys(entries):
+    return [Post(pk=pk, pub_date=pub_date) for pk, pub_date in entries]
+
+
+class EntryFeed:
+    """Лента из материализованных записей, отдаёт ключи постов.
+
+    Подходит и Paginator (count и срезы), и KeysetPaginator
+    (окно по курсору на том же индексе, что и сортировка).
+    """
+    fields = ('pub_date', 'post_id')
+
+    def __init__(self, entries):
+        self.entries = entries.order_by(
+            '-pub_date', '-post_id'
+        ).values_list('post_id', 'pub_date')
+
+    def count(self):
+        return self.entries.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        return entry_keys(self.entries[key])
+
+    def keyset_window(self, after, before, limit):
+        entries, has_more = keyset_window(
+            self.entries, after, before, limit, self.fields
+        )
+        return entry_keys(entries), has_more
+
+
+class PostStream:
+    """Посты одного автора, которые читаются напрямую, без ленты."""
+    fields = KEYSET_FIELDS
+
+    def __init__(self, posts):
+        self.posts = post_keys(posts).order_by('-pub_date', '-pk')
+
+    def count(self):
+        return self.posts.count()
+
+    def __getitem__(self, key):
+        return list(self.posts[key])
+
+    def keyset_window(self, after, before, limit):
+        return keyset_window(self.posts, after, before, limit, self.fields)
+
+
+class MergedFeed:
+    """k-путевое слияние нескольких лент, отсортированных по убыванию.
+
+    Каждый поток отдаёт не больше нужного числа постов, поэтому стоимость
+    страницы зависит от числа потоков, а не от их длины.
+    """
+
+    def __init__(self, streams):
+        self.streams = streams
+
+    def count(self):
+        return sum(stream.count() for stream in self.streams)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        merged = heapq.merge(
+            *(stream[:key.stop] for stream in self.streams),
+            key=post_key,
+            reverse=True
+        )
+        return list(merged)[key]
+
+    def keyset_window(self, after, before, limit):
+        windows = [
+            stream.keyset_window(after, before, limit)
+            for stream in self.streams
+        ]
+        merged = list(heapq.merge(
+            *(posts for posts, _ in windows), key=post_key, reverse=True
+        ))
+        has_more = len(merged) > limit or any(more for _, more in windows)
+        if before is not None:
+            return merged[-limit:], has_more
+        return merged[:limit], has_more
+
+
+def pulled_authors(user):
+    """Авторы из подписок, чьи посты не раскладывались по лентам."""
+    return Follow.objects.filter(user=user).annotate(
+        pulled=Exists(Post.objects.filter(
+            author_id=OuterRef('author_id'),
+            fanned_out=False
+        ))
+    ).filter(pulled=True).values_list('author_id', flat=True)
+
+
+def follow_feed(user):
+    """Лента подписок: материализованная часть плюс посты популярных авторов.
+
+    Посты обычных авторов уже лежат в Timeline, посты авторов с числом
+    подписчиков не меньше FEED_FANOUT_THRESHOLD подмешиваются при чтении.
+    """
+    streams = [EntryFeed(Timeline.objects.filter(user=user))]
+    streams += [
+        PostStream(Post.objects.filter(author_id=author_id, fanned_out=False))
+        for author_id in pulled_authors(user)
+    ]
+    if len(streams) == 1:
+        return streams[0]
+    return MergedFeed(streams)
+
+
+def is_fanned_out(author_id):
+    """Раскладывать ли посты автора по лентам подписчиков."""
+    followers = Profile.objects.filter(
+        user_id=author_id
+    ).values_list('follower_count', flat=True).first()
+    return (followers or 0) < settings.FEED_FANOUT_THRESHOLD
+
+
+def push(posts, user_ids):
+    """Вставляет пары (pk, дата) постов в ленты пользователей."""
+    Timeline.objects.bulk_create(
+        [
+            Timeline(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+            for user_id in user_ids
+        ],
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if not post.fanned_out:
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    push([(post.pk, post.pub_date)], list(followers))
+
+
+def backfill(follow):
+    """Добавляет в ленту подписчика последние FEED_BACKFILL_LIMIT уже
+    разложенных постов автора: ленте хватает их на первые страницы,
+    а подписка не зависит от того, сколько автор написал.
+    """
+    posts = Post.objects.filter(
+        author_id=follow.author_id, fanned_out=True
+    ).order_by('-pub_date', '-pk')[:settings.FEED_BACKFILL_LIMIT]
+    push(posts.values_list('pk', 'pub_date'), [follow.user_id])
+
+
+def trim(follow):
+    """Убирает из ленты подписчика посты автора после отписки.
+
+    Если автор опустился ниже порога, его нераскладанные посты
+    раскладываются по лентам оставшихся подписчиков.
+    """
+    Timeline.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id
+    ).delete()
+    if is_fanned_out(follow.author_id):
+        settle(follow.author_id)
+
+
+def settle(author_id):
+    posts = Post.objects.filter(author_id=author_id, fanned_out=False)
+    if not posts.exists():
+        return
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    push(posts.values_list('pk', 'pub_date'), list(followers))
+    posts.update(fanned_out=True)
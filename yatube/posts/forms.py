@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 
 from .models import Post, Comment
 
@@ -13,6 +14,29 @@ class PostForm(forms.ModelForm):
             'image'
         )
 
+    def clean_image(self):
+        """Размеры проверяются по заголовку, который поле уже разобрало,
+        до того как картинку целиком раскодирует пул миниатюр.
+        """
+        image = self.cleaned_data['image']
+        header = getattr(image, 'image', None)
+        if header is not None:
+            width, height = header.size
+            if width * height > settings.IMAGE_MAX_PIXELS:
+                raise forms.ValidationError(
+                    f'Картинка {width}×{height} слишком большая, '
+                    f'допустимо до {settings.IMAGE_MAX_PIXELS} пикселей.'
+                )
+        return image
+
+    def clean(self):
+        image = self.files.get('image')
+        if getattr(image, 'rejection', None):
+            # поле отвергло урезанный файл, сообщаем настоящую причину
+            self._errors['image'] = self.error_class([image.rejection])
+            self.cleaned_data.pop('image', None)
+        return super().clean()
+
 
 class CommentForm(forms.ModelForm):
 
@@ -21,3 +45,20 @@ class CommentForm(forms.ModelForm):
         fields = (
             'text',
         )
+
+
+class ReplyForm(forms.Form):
+    """Комментарий, на который отвечают; отдельно от CommentForm,
+    у которой одно поле text.
+    """
+    parent = forms.ModelChoiceField(
+        queryset=Comment.objects.none(),
+        required=False,
+        widget=forms.HiddenInput
+    )
+
+    def __init__(self, *args, post=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # отвечать можно только на комментарии этого поста
+        if post is not None:
+            self.fields['parent'].queryset = post.comments.all()
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import InvalidCacheBackendError, cache, caches
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+
+from core.cache import bump_generation, generation
+
+# сдвигается при удалении миниатюр, сбрасывает LRU всех процессов
+GENERATION = 'thumbnails'
+
+
+def is_image_key(key):
+    return key.startswith(add_prefix('', 'image'))
+
+
+class KVStore(KVStoreBase):
+    """Метаданные миниатюр sorl в кеше Django вместо базы.
+
+    Описание миниатюры не меняется (её имя выводится из исходника и
+    опций), поэтому описания ещё держатся в LRU процесса. Удаление
+    миниатюр сдвигает поколение в том же кеше, и не чаще раза в
+    THUMBNAIL_LRU_CHECK секунд процесс сверяет с ним свой LRU. Кеш не
+    умеет перечислять ключи, так что clear() и cleanup() ничего не делают.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked = 0
+
+    @property
+    def cache(self):
+        try:
+            return caches[settings.THUMBNAIL_CACHE]
+        except InvalidCacheBackendError:
+            return cache
+
+    def validate(self):
+        """Сбрасывает LRU, если миниатюры удалялись в любом процессе."""
+        now = time.monotonic()
+        if now - self.checked < settings.THUMBNAIL_LRU_CHECK:
+            return
+        version = generation(GENERATION, self.cache)
+        with self.lock:
+            if version != self.version:
+                self.local.clear()
+                self.version = version
+            self.checked = now
+
+    def remember(self, key, value):
+        with self.lock:
+            self.local[key] = value
+            self.local.move_to_end(key)
+            while len(self.local) > settings.THUMBNAIL_LRU_SIZE:
+                self.local.popitem(last=False)
+
+    def prefetch(self, image_files):
+        """Подгружает описания всех image_files одним get_many."""
+        keys = {add_prefix(image_file.key) for image_file in image_files}
+        self.validate()
+        with self.lock:
+            keys.difference_update(self.local)
+        for key, value in self.cache.get_many(keys).items():
+            self.remember(key, value)
+
+    def _get_raw(self, key):
+        self.validate()
+        with self.lock:
+            if key in self.local:
+                self.local.move_to_end(key)
+                return self.local[key]
+        value = self.cache.get(key)
+        if value is not None and is_image_key(key):
+            self.remember(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        self.cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+        if is_image_key(key):
+            self.remember(key, value)
+
+    def _delete_raw(self, *keys):
+        self.cache.delete_many(keys)
+        with self.lock:
+            for key in keys:
+                self.local.pop(key, None)
+        bump_generation(GENERATION, self.cache)
+
+    def _find_keys_raw(self, prefix):
+        return []
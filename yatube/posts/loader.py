@@ -0,0 +1,35 @@
+from django.utils.functional import SimpleLazyObject
+
+from .models import Follow, Post
+
+
+def load_posts(ids):
+    """Посты с авторами и группами одним запросом, в порядке ids."""
+    posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def following(viewer, author_ids):
+    """Кого из author_ids читает viewer: один запрос."""
+    if viewer is None or not viewer.is_authenticated or not author_ids:
+        return set()
+    return set(Follow.objects.filter(
+        user=viewer, author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+
+
+def load_page(page):
+    """Загрузчик страницы ленты.
+
+    Пагинаторы выбирают только ключи постов (pk и дату) по индексу,
+    а посты с авторами и группами догружаются здесь одним запросом,
+    сколько бы их ни было на странице. Загрузка ленивая — при первом
+    обращении к постам страницы, поэтому фрагмент, взятый из кеша, базу
+    не трогает. Описания миниатюр читает из кеша одним get_many
+    post_cards, и только для карточек, которых нет в кеше.
+    """
+    keys = page.object_list
+    page.object_list = SimpleLazyObject(
+        lambda: load_posts([post.pk for post in keys])
+    )
+    return page
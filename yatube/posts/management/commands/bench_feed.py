@@ -0,0 +1,106 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from posts.counters import rebuild
+from posts.feed import follow_feed
+from posts.loader import load_page
+from posts.models import Follow, Group, Post, Profile, Tag
+from posts.utils import encode_cursor, paginate
+
+User = get_user_model()
+
+
+def percentile(samples, share):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def measure(action, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        action()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p99 публикации и чтения ленты подписок для обычного '
+        'и популярного автора. Данные создаются в транзакции и '
+        'откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=5000)
+        parser.add_argument('--posts', type=int, default=200)
+        parser.add_argument('--runs', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options['followers'], options['posts'], options['runs'])
+            transaction.set_rollback(True)
+
+    def run(self, followers, posts, runs):
+        threshold = settings.FEED_FANOUT_THRESHOLD
+        regular = User.objects.create(username='bench_regular')
+        star = User.objects.create(username='bench_star')
+        User.objects.bulk_create(
+            User(username=f'bench_reader_{i}')
+            for i in range(max(followers, threshold))
+        )
+        readers = list(
+            User.objects.filter(username__startswith='bench_reader_')
+        )
+        Follow.objects.bulk_create(
+            [Follow(user=reader, author=star) for reader in readers]
+            + [
+                Follow(user=reader, author=regular)
+                for reader in readers[:threshold - 1]
+            ]
+        )
+        rebuild(
+            profiles=Profile.objects.filter(user__in=(regular, star)),
+            groups=Group.objects.none(),
+            posts=Post.objects.none(),
+            tags=Tag.objects.none()
+        )
+        reader = readers[0]
+        for i in range(posts):
+            Post.objects.create(text=f'Пост {i}', author=regular)
+            Post.objects.create(text=f'Пост {i}', author=star)
+
+        rows = []
+        for name, author in (('regular', regular), ('popular', star)):
+            rows.append((f'publish ({name})', measure(
+                lambda: Post.objects.create(text='Замер', author=author),
+                runs
+            )))
+        factory = RequestFactory()
+        deep = list(follow_feed(reader)[:posts])[-1]
+        for name, params in (
+            ('first page', {}),
+            ('deep page', {'after': encode_cursor(deep)}),
+        ):
+            request = factory.get('/follow/', params)
+            rows.append((f'follow feed, {name}', measure(
+                lambda: list(
+                    load_page(paginate(request, follow_feed(reader)))
+                ),
+                runs
+            )))
+
+        self.stdout.write(
+            f'threshold={threshold} followers={len(readers)} '
+            f'posts per author={posts} runs={runs}'
+        )
+        for name, samples in rows:
+            self.stdout.write(
+                f'{name:<28} p50={percentile(samples, 0.5):8.2f} ms '
+                f'p99={percentile(samples, 0.99):8.2f} ms'
+            )
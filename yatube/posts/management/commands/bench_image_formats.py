@@ -0,0 +1,86 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageOps
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from posts.models import Post
+from posts.thumbnails import extra_formats
+
+from .bench_feed import measure, percentile
+
+
+def encode(image, format_, quality):
+    buffer = BytesIO()
+    image.save(buffer, format=format_, quality=quality, optimize=True)
+    return buffer.tell()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время кодирования и размер миниатюр в исходном '
+        'формате и в форматах THUMBNAIL_FORMATS, которые умеет Pillow.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='файлы картинок; по умолчанию — картинки последних постов'
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--quality', type=int, default=80)
+
+    def sources(self, paths, limit):
+        if paths:
+            return [Image.open(path) for path in paths]
+        images = []
+        for name in Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        )[:limit]:
+            try:
+                images.append(default.engine.get_image(ImageFile(name)))
+            except Exception:
+                self.stderr.write(f'пропущен {name}')
+        return images
+
+    def handle(self, *args, **options):
+        images = self.sources(options['paths'], options['limit'])
+        if not images:
+            raise CommandError('Нет картинок для замера.')
+        geometry_string = settings.THUMBNAIL_SIZES[0]
+        geometry = parse_geometry(geometry_string)
+        thumbs = [
+            (image.format or 'JPEG',
+             ImageOps.fit(image.convert('RGB'), geometry))
+            for image in images
+        ]
+
+        formats = ['original', *extra_formats()]
+        totals = {format_: 0 for format_ in formats}
+        samples = {format_: [] for format_ in formats}
+        for source_format, thumb in thumbs:
+            for format_ in formats:
+                target = source_format if format_ == 'original' else format_
+                totals[format_] += encode(thumb, target, options['quality'])
+                samples[format_] += measure(
+                    lambda: encode(thumb, target, options['quality']),
+                    options['runs']
+                )
+
+        self.stdout.write(
+            f'images={len(thumbs)} geometry={geometry_string} '
+            f'quality={options["quality"]} runs={options["runs"]}'
+        )
+        for format_ in formats:
+            share = totals[format_] / totals['original'] * 100
+            self.stdout.write(
+                f'{format_:<10} '
+                f'p50={percentile(samples[format_], 0.5):8.2f} ms '
+                f'p99={percentile(samples[format_], 0.99):8.2f} ms '
+                f'size={totals[format_] / len(thumbs) / 1024:8.1f} KiB '
+                f'({share:5.1f}% of original)'
+            )
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_image_hashed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Крошечный JPEG картинки в виде data URI', verbose_name='Заглушка картинки'),
+        ),
+    ]
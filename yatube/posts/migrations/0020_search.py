@@ -0,0 +1,39 @@
+from django.db import migrations
+
+from posts.triggers import SEARCH_COMMENT, SEARCH_POST, create_sql, drop_sql
+
+# Посты и комментарии лежат в одном индексе FTS5, его триггеры —
+# в posts.triggers.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE posts_search USING fts5(
+        text, post_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    *create_sql(*SEARCH_POST, *SEARCH_COMMENT),
+    """
+    INSERT INTO posts_search (rowid, text, post_id)
+    SELECT id * 2, text, id FROM posts_post
+    """,
+    """
+    INSERT INTO posts_search (rowid, text, post_id)
+    SELECT id * 2 + 1, text, post_id FROM posts_comment
+    """,
+]
+
+DROP_SQL = [
+    *drop_sql(*SEARCH_POST, *SEARCH_COMMENT),
+    'DROP TABLE posts_search',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_placeholder'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
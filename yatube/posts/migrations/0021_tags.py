@@ -0,0 +1,73 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+TAG_PATTERN = re.compile(r'(?<!\w)#(\w{1,50})')
+
+
+def fill_tags(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Tag = apps.get_model('posts', 'Tag')
+    TaggedPost = apps.get_model('posts', 'TaggedPost')
+    tags = {}
+    entries = []
+    for pk, text, pub_date in Post.objects.values_list(
+        'pk', 'text', 'pub_date'
+    ).iterator():
+        names = {name.lower() for name in TAG_PATTERN.findall(text)}
+        for name in names:
+            if name not in tags:
+                tags[name] = Tag.objects.create(name=name)
+            tags[name].post_count += 1
+            entries.append(
+                TaggedPost(tag=tags[name], post_id=pk, pub_date=pub_date)
+            )
+    TaggedPost.objects.bulk_create(entries, batch_size=500)
+    Tag.objects.bulk_update(tags.values(), ['post_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Название')),
+                ('post_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaggedPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_entries', to='posts.Post')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='posts.Tag')),
+            ],
+            options={
+                'verbose_name': 'Пост с тегом',
+                'verbose_name_plural': 'Посты с тегами',
+                'ordering': ['-pub_date', '-post_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='taggedpost',
+            index=models.Index(fields=['tag', '-pub_date', '-post'], name='tagged_post_tag_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='taggedpost',
+            constraint=models.UniqueConstraint(fields=('post', 'tag'), name='unique_tagged_post'),
+        ),
+        migrations.RunPython(fill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from posts.triggers import SEARCH_COMMENT, create_sql
+
+
+def fill_paths(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    comments = list(Comment.objects.only('pk'))
+    for comment in comments:
+        comment.path = f'{comment.pk:08x}'
+    Comment.objects.bulk_update(comments, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_comment_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_post_created_id_idx',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Глубина'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment', verbose_name='Ответ на'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Путь'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'depth', '-created', '-id'], name='comment_post_roots_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        # SQLite пересоздал таблицу, и триггеры поиска на ней пропали
+        migrations.RunSQL(create_sql(*SEARCH_COMMENT), migrations.RunSQL.noop),
+    ]
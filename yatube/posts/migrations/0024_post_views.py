@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:45
+
+from django.db import migrations, models
+
+from posts.triggers import SEARCH_POST, create_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='views',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Просмотры'),
+        ),
+        # SQLite пересоздал таблицу, и триггеры поиска на ней пропали
+        migrations.RunSQL(create_sql(*SEARCH_POST), migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from posts.triggers import COMMENT_PATH, create_sql, drop_sql
+
+
+def fill_missing_paths(apps, schema_editor):
+    """Пути комментариев, вставленных в обход сигналов."""
+    Comment = apps.get_model('posts', 'Comment')
+    paths = {}
+    for comment in Comment.objects.filter(path='').select_related(
+        'parent'
+    ).order_by('pk'):
+        prefix = ''
+        if comment.parent_id:
+            prefix = paths.get(comment.parent_id, comment.parent.path)
+        path = paths[comment.pk] = f'{prefix}{comment.pk:08x}'
+        Comment.objects.filter(pk=comment.pk).update(
+            path=path, depth=len(path) // 8 - 1
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_post_views'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_missing_paths, migrations.RunPython.noop),
+        migrations.RunSQL(create_sql(COMMENT_PATH), drop_sql(COMMENT_PATH)),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:14
+
+from django.db import migrations, models
+
+from posts import triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_comment_path_trigger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Растёт, когда готовы все миниатюры и заглушка картинки', verbose_name='Версия миниатюр'),
+        ),
+        # SQLite пересоздал таблицу, и триггеры на ней пропали
+        triggers.restore('posts_post'),
+    ]
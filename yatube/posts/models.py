@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import HashedFileSystemStorage
+
 User = get_user_model()
 
 
@@ -8,6 +10,11 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=50, unique=True)
     description = models.TextField(max_length=200)
+    post_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
@@ -22,6 +29,10 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -37,16 +48,64 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост'
     )
+    # одинаковые картинки хранятся одним файлом, по имени ищутся ссылки
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=HashedFileSystemStorage(),
+        blank=True,
+        db_index=True
+    )
+    placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False,
+        help_text='Крошечный JPEG картинки в виде data URI'
+    )
+    image_version = models.PositiveIntegerField(
+        'Версия миниатюр',
+        default=0,
+        editable=False,
+        help_text='Растёт, когда готовы все миниатюры и заглушка картинки'
+    )
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+    fanned_out = models.BooleanField(
+        'Разложен по лентам',
+        default=True,
+        editable=False
+    )
+    views = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        editable=False
     )
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'fanned_out', '-pub_date', '-id'],
+                name='post_author_pull_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -73,11 +132,41 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Дата комментария'
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        verbose_name='Ответ на'
+    )
+    # pk предков и свой, по SEGMENT_WIDTH hex-цифр: ветка — диапазон путей
+    path = models.CharField(
+        'Путь',
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+    depth = models.PositiveSmallIntegerField(
+        'Глубина',
+        default=0,
+        editable=False
+    )
 
     class Meta:
-        ordering = ['-created']
+        ordering = ['-created', '-id']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'depth', '-created', '-id'],
+                name='comment_post_roots_idx'
+            ),
+            models.Index(
+                fields=['post', 'path'],
+                name='comment_post_path_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -103,3 +192,120 @@ class Follow(models.Model):
                 fields=['user', 'author', ], name='uniqe_follow'
             )
         ]
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок: копия пары (пост, дата) на читателя.
+
+    Заполняется при публикации поста и при подписке, поэтому чтение ленты
+    сводится к одному проходу по индексу (user, pub_date, post).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date', '-post_id']
+        verbose_name = 'Лента подписок'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post', ], name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            )
+        ]
+
+
+class Tag(models.Model):
+    name = models.CharField('Название', max_length=50, unique=True)
+    post_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return self.name
+
+
+class TaggedPost(models.Model):
+    """Обратный индекс тегов: пара (тег, пост) с датой поста.
+
+    Заполняется при сохранении поста по #тегам в тексте; страница тега
+    читается одним проходом по индексу (tag, pub_date, post).
+    """
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='tag_entries'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date', '-post_id']
+        verbose_name = 'Пост с тегом'
+        verbose_name_plural = 'Посты с тегами'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'tag', ], name='unique_tagged_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', '-pub_date', '-post'],
+                name='tagged_post_tag_pub_date_idx'
+            )
+        ]
+
+
+class Profile(models.Model):
+    """Счётчики пользователя, которые иначе считались бы COUNT на каждом
+    рендере. Обновляются атомарно через F() из сигналов.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile'
+    )
+    post_count = models.PositiveIntegerField('Число постов', default=0)
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0
+    )
+    follower_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Число подписок',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return str(self.user)
@@ -0,0 +1,54 @@
+import re
+
+from django.db import connection
+
+from .models import Post
+
+SEARCH_TABLE = 'posts_search'
+
+
+def match_expression(query):
+    """Выражение FTS5: все слова запроса, каждое как префикс.
+
+    Слова берутся в кавычки, так что синтаксис FTS5 в запросе
+    не действует.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+class SearchResults:
+    """Посты, найденные в индексе FTS5 по своему тексту или тексту
+    комментариев, от более к менее релевантным (bm25).
+
+    Подходит Paginator: count и срезы читают только индекс и отдают
+    ключи постов, которые догружает loader.
+    """
+
+    def __init__(self, query):
+        self.match = match_expression(query)
+
+    def fetch(self, sql, params=()):
+        if not self.match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self.match, *params])
+            return cursor.fetchall()
+
+    def count(self):
+        rows = self.fetch(
+            f'SELECT COUNT(DISTINCT post_id) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s'
+        )
+        return rows[0][0] if rows else 0
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        return [Post(pk=row[0]) for row in self.fetch(
+            f'SELECT post_id FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s '
+            'GROUP BY post_id ORDER BY MIN(rank), post_id DESC '
+            'LIMIT %s OFFSET %s',
+            (key.stop - key.start, key.start)
+        )]
@@ -0,0 +1,156 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.cache import bump_generation
+
+from . import autocomplete, counters, feed, tags, threads, thumbnails
+from .models import (
+    Comment, Follow, Group, Post, Profile, Tag, TaggedPost, User
+)
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw, update_fields, **kwargs):
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+    # вход пользователя обновляет только last_login и ленту не меняет
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_generation('index')
+
+
+@receiver(post_save, sender=User)
+def user_indexed(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'username' in update_fields:
+        autocomplete.user_saved(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_unindexed(sender, instance, **kwargs):
+    autocomplete.user_deleted(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_indexed(sender, instance, **kwargs):
+    autocomplete.group_saved(instance)
+
+
+@receiver(post_delete, sender=Group)
+def group_unindexed(sender, instance, **kwargs):
+    autocomplete.group_deleted(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def listing_changed(sender, **kwargs):
+    bump_generation('index')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comments_changed(sender, instance, **kwargs):
+    bump_generation(f'comments:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follows_changed(sender, instance, **kwargs):
+    # меняются лента подписчика и страница автора
+    bump_generation(f'follow:{instance.user.username}')
+    bump_generation(f'follow:{instance.author.username}')
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    # загрузка ещё не в хранилище, она нужна thumbnails.keep()
+    instance.image_upload = (
+        instance.image.file
+        if instance.image and not instance.image._committed else None
+    )
+    if instance._state.adding:
+        instance.fanned_out = feed.is_fanned_out(instance.author_id)
+    else:
+        instance.previous_group_id, instance.previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, '')
+        )
+        if instance.previous_image != instance.image.name:
+            instance.placeholder = ''
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_profile(instance.author_id, post_count=1)
+        counters.bump_group(instance.group_id, post_count=1)
+        feed.fan_out(instance)
+    elif instance.previous_group_id != instance.group_id:
+        counters.bump_group(instance.previous_group_id, post_count=-1)
+        counters.bump_group(instance.group_id, post_count=1)
+    if not created and instance.previous_image != instance.image.name:
+        thumbnails.release(instance.previous_image)
+    if instance.image:
+        thumbnails.keep(instance)
+        thumbnails.generate(instance)
+    tags.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    thumbnails.release(instance.image.name)
+    counters.bump(Profile.objects.filter(user_id=instance.author_id),
+                  post_count=-1)
+    counters.bump_group(instance.group_id, post_count=-1)
+
+
+@receiver(pre_save, sender=Comment)
+def comment_saving(sender, instance, **kwargs):
+    if instance._state.adding:
+        threads.place(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        threads.assign_path(instance)
+        counters.bump(Post.objects.filter(pk=instance.post_id),
+                      comment_count=1)
+        counters.bump_profile(instance.author_id, comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump(Post.objects.filter(pk=instance.post_id), comment_count=-1)
+    counters.bump(Profile.objects.filter(user_id=instance.author_id),
+                  comment_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_profile(instance.author_id, follower_count=1)
+        counters.bump_profile(instance.user_id, following_count=1)
+        feed.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump(Profile.objects.filter(user_id=instance.author_id),
+                  follower_count=-1)
+    counters.bump(Profile.objects.filter(user_id=instance.user_id),
+                  following_count=-1)
+    feed.trim(instance)
+
+
+@receiver(post_save, sender=TaggedPost)
+def tagged_post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(Tag.objects.filter(pk=instance.tag_id), post_count=1)
+
+
+@receiver(post_delete, sender=TaggedPost)
+def tagged_post_deleted(sender, instance, **kwargs):
+    counters.bump(Tag.objects.filter(pk=instance.tag_id), post_count=-1)
@@ -0,0 +1,54 @@
+import re
+
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .feed import EntryFeed
+from .models import Tag, TaggedPost
+
+TAG_PATTERN = re.compile(r'(?<!\w)#(\w{1,50})')
+
+
+def extract_tags(text):
+    """Имена #тегов текста в нижнем регистре, без повторов."""
+    return list(dict.fromkeys(
+        name.lower() for name in TAG_PATTERN.findall(text)
+    ))
+
+
+def index_post(post):
+    """Приводит записи обратного индекса поста к тегам в его тексте."""
+    names = set(extract_tags(post.text))
+    TaggedPost.objects.filter(post=post).exclude(tag__name__in=names).delete()
+    names -= set(TaggedPost.objects.filter(post=post).values_list(
+        'tag__name', flat=True
+    ))
+    for name in sorted(names):
+        tag, _ = Tag.objects.get_or_create(name=name)
+        TaggedPost.objects.create(tag=tag, post=post, pub_date=post.pub_date)
+
+
+def link_tags(text):
+    """Экранированный текст, в котором #теги ссылаются на свои страницы."""
+    parts, start = [], 0
+    for match in TAG_PATTERN.finditer(text):
+        url = reverse('posts:tag_posts', args=[match.group(1).lower()])
+        parts += [
+            escape(text[start:match.start()]),
+            f'<a href="{url}">{escape(match.group(0))}</a>',
+        ]
+        start = match.end()
+    parts.append(escape(text[start:]))
+    return mark_safe(''.join(parts))
+
+
+class TagFeed(EntryFeed):
+    """Посты с тегом по обратному индексу; число постов — из счётчика."""
+
+    def __init__(self, tag):
+        super().__init__(tag.entries.all())
+        self.tag = tag
+
+    def count(self):
+        return self.tag.post_count
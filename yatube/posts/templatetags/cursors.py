@@ -0,0 +1,10 @@
+from django import template
+
+from posts.utils import encode_cursor
+
+register = template.Library()
+
+
+@register.filter
+def cursor(post):
+    return encode_cursor(post)
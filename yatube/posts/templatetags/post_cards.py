@@ -0,0 +1,54 @@
+import hashlib
+
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.thumbnails import prefetch
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+# Карточка адресуется своим содержимым, поэтому может жить долго.
+CARD_TIMEOUT = 60 * 60 * 24
+# Место числа просмотров: оно меняется при каждом сбросе счётчиков,
+# поэтому в кеш карточки не входит и подставляется при выводе.
+VIEWS_MARKER = '<!--views-->'
+
+
+def card_key(post):
+    """Ключ карточки: меняется вместе со всем, что в ней выводится."""
+    group_slug = post.group.slug if post.group_id else ''
+    version = (
+        f'{post.updated.isoformat()}:{post.image_version}:'
+        f'{post.author.username}:'
+        f'{post.author.get_full_name()}:{group_slug}'
+    )
+    digest = hashlib.md5(version.encode()).hexdigest()
+    return f'post_card:{post.pk}:{digest}'
+
+
+@register.simple_tag
+def post_cards(posts):
+    """HTML карточек страницы: кеш читается одним get_many,
+    рендерятся только отсутствующие в нём карточки.
+    """
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    cards = cache.get_many(keys)
+    prefetch(
+        post.image for key, post in zip(keys, posts) if key not in cards
+    )
+    missing = {
+        key: render_to_string(CARD_TEMPLATE, {'post': post})
+        for key, post in zip(keys, posts)
+        if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+        cards.update(missing)
+    return [
+        mark_safe(cards[key].replace(VIEWS_MARKER, str(post.views), 1))
+        for key, post in zip(keys, posts)
+    ]
@@ -0,0 +1,15 @@
+from django import template
+
+from posts.forms import CommentForm, ReplyForm
+
+register = template.Library()
+
+
+@register.simple_tag
+def comment_form():
+    return CommentForm()
+
+
+@register.simple_tag
+def reply_form(reply_to=None):
+    return ReplyForm(initial={'parent': reply_to})
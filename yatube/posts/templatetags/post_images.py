@@ -0,0 +1,41 @@
+from django import template
+from PIL import Image
+from sorl.thumbnail.images import DummyImageFile
+
+from posts.thumbnails import extra_formats, get_thumbnails
+
+register = template.Library()
+
+
+def srcset(thumbnails):
+    return ', '.join(
+        f'{thumbnail.url} {thumbnail.width}w' for thumbnail in thumbnails
+        if not isinstance(thumbnail, DummyImageFile)
+    )
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post):
+    """Картинка поста: <picture> с готовыми миниатюрами в AVIF/WebP,
+    формат по поддержке выбирает сам браузер. Пока картинка грузится,
+    на её месте видна встроенная в страницу размытая заглушка.
+    """
+    image = post.image
+    if not image:
+        return {}
+    thumbnails = get_thumbnails(image)
+    width = thumbnails[0].width
+    sources = []
+    for format_ in extra_formats():
+        candidates = srcset(get_thumbnails(image, format_))
+        if candidates:
+            sources.append((Image.MIME[format_], candidates))
+    return {
+        'src': thumbnails[0].url,
+        'srcset': srcset(thumbnails),
+        'sizes': f'(max-width: {width}px) 100vw, {width}px',
+        'sources': sources,
+        'width': width,
+        'height': thumbnails[0].height,
+        'placeholder': post.placeholder,
+    }
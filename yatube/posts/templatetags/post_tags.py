@@ -0,0 +1,10 @@
+from django import template
+
+from posts.tags import link_tags
+
+register = template.Library()
+
+
+@register.filter
+def tag_links(text):
+    return link_tags(text)
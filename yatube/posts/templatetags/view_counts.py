@@ -0,0 +1,11 @@
+from django import template
+
+from posts import view_counts
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_views(post_id):
+    """Число просмотров поста, см. view_counts.total()."""
+    return view_counts.total(post_id)
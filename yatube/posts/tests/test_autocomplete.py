@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import autocomplete
+from posts.models import Group
+
+User = get_user_model()
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User.objects.create_user(username='anna')
+        User.objects.create_user(username='Andrey')
+        User.objects.create_user(username='boris')
+        Group.objects.create(
+            title='Любители кошек', slug='cats', description='Про кошек'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def suggest(self, prefix):
+        response = self.client.get(
+            reverse('posts:autocomplete'), {'q': prefix}
+        )
+        return [item['value'] for item in response.json()['results']]
+
+    def test_prefixes(self):
+        """Подсказки по началу имени, slug и слов названия группы."""
+        self.assertEqual(self.suggest('an'), ['Andrey', 'anna'])
+        self.assertEqual(self.suggest('кош'), ['cats'])
+        self.assertEqual(self.suggest('ca'), ['cats'])
+        self.assertEqual(self.suggest('z'), [])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_answered_without_database(self):
+        """Загруженный индекс отвечает без запросов к базе."""
+        self.suggest('a')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('bor'), ['boris'])
+
+    def test_updated_on_save(self):
+        """Сигналы правят индекс процесса без полной перестройки."""
+        self.suggest('a')
+        user = User.objects.create_user(username='vera')
+        group = Group.objects.get(slug='cats')
+        group.slug = 'kittens'
+        group.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('ve'), ['vera'])
+            self.assertEqual(self.suggest('ca'), [])
+            self.assertEqual(self.suggest('kit'), ['kittens'])
+        user.delete()
+        self.assertEqual(self.suggest('ve'), [])
+
+    def test_rebuilt_after_foreign_change(self):
+        """Изменение в другом процессе перестраивает индекс."""
+        self.suggest('a')
+        autocomplete.bump_generation(autocomplete.GENERATION)
+        User.objects.bulk_create([User(username='gleb')])
+        self.assertEqual(self.suggest('gl'), ['gleb'])
+
+    @override_settings(AUTOCOMPLETE_MAX_AGE=0)
+    def test_rebuilt_when_expired(self):
+        """Без сдвига поколения индекс перестраивается по сроку."""
+        self.suggest('a')
+        User.objects.bulk_create([User(username='gleb')])
+        self.assertEqual(self.suggest('gl'), ['gleb'])
+
+    def test_load_sorts_once(self):
+        """Перестройка сортирует массив разом, без вставок по одной."""
+        with mock.patch.object(autocomplete, 'insort') as insort:
+            fresh = autocomplete.load()
+        insort.assert_not_called()
+        self.assertEqual(fresh.terms, sorted(fresh.terms))
+        self.assertEqual(len(fresh.items), User.objects.count() + 1)
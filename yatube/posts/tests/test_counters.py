@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, Profile
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User1')
+        cls.author = User.objects.create_user(username='User2')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание группы'
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_post_and_comment_counters(self):
+        """Публикация и комментарий сдвигают счётчики, удаление — обратно"""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Тестовый пост', 'group': self.group.id}
+        )
+        post = Post.objects.get(author=self.user)
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Тестовый комментарий'}
+        )
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.group.post_count, 1)
+        self.assertEqual(profile.post_count, 1)
+        self.assertEqual(profile.comment_count, 1)
+        post.delete()
+        self.group.refresh_from_db()
+        profile.refresh_from_db()
+        self.assertEqual(self.group.post_count, 0)
+        self.assertEqual(profile.post_count, 0)
+        self.assertEqual(profile.comment_count, 0)
+
+    def test_follow_counters(self):
+        """Подписка и отписка сдвигают счётчики подписчиков и подписок"""
+        url_kwargs = {'username': self.author}
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs=url_kwargs)
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.author).follower_count, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.user).following_count, 1
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs=url_kwargs)
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.author).follower_count, 0
+        )
+
+    def test_rebuild_counters_command(self):
+        """Команда rebuild_counters восстанавливает разошедшиеся счётчики"""
+        Post.objects.create(text='Тестовый пост', author=self.author)
+        Profile.objects.filter(user=self.author).update(post_count=42)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(
+            Profile.objects.get(user=self.author).post_count, 1
+        )
+
+    def test_drifted_counter_does_not_block_delete(self):
+        """Удаление не падает, если счётчик уже ушёл в ноль"""
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        Profile.objects.filter(user=self.user).update(post_count=0)
+        Group.objects.filter(pk=self.group.pk).update(post_count=0)
+        post.delete()
+        self.assertEqual(
+            Profile.objects.get(user=self.user).post_count, 0
+        )
+        self.assertEqual(Group.objects.get(pk=self.group.pk).post_count, 0)
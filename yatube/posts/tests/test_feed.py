@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, Timeline
+from posts.utils import encode_cursor
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки',
+            author=cls.author
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def follow(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.author})
+        )
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора"""
+        self.follow()
+        self.assertTrue(
+            Timeline.objects.filter(
+                user=self.reader, post=self.old_post
+            ).exists()
+        )
+
+    @override_settings(FEED_BACKFILL_LIMIT=2)
+    def test_backfill_limited_to_newest_posts(self):
+        """При подписке в ленту попадают только последние посты автора"""
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        self.follow()
+        self.assertEqual(
+            set(Timeline.objects.filter(
+                user=self.reader
+            ).values_list('post_id', flat=True)),
+            {posts[1].pk, posts[2].pk}
+        )
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост раскладывается в ленты подписчиков"""
+        self.follow()
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка убирает посты автора из ленты"""
+        self.follow()
+        self.authorized_client.get(
+            reverse(
+                'posts:profile_unfollow', kwargs={'username': self.author}
+            )
+        )
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+
+
+@override_settings(FEED_FANOUT_THRESHOLD=2)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.fan = User.objects.create_user(username='Fan')
+        cls.star = User.objects.create_user(username='Star')
+        cls.author = User.objects.create_user(username='Author')
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.fan, author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = []
+        for i in range(6):
+            author = cls.star if i % 2 else cls.author
+            cls.posts.append(
+                Post.objects.create(text=f'Пост {i}', author=author)
+            )
+        cls.posts.reverse()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_popular_author_is_not_fanned_out(self):
+        """Посты автора выше порога не пишутся в ленты"""
+        self.assertFalse(
+            Timeline.objects.filter(post__author=self.star).exists()
+        )
+        self.assertEqual(
+            Timeline.objects.filter(post__author=self.author).count(), 3
+        )
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        """Лента сливает разложенные и подмешанные посты по дате"""
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), self.posts)
+        response = self.authorized_client.get(
+            reverse('posts:follow_index'),
+            {'after': encode_cursor(self.posts[1])}
+        )
+        self.assertEqual(list(response.context['page_obj']), self.posts[2:])
+
+    def test_dropping_below_threshold_settles_posts(self):
+        """Автор ниже порога раскладывает свои посты по лентам"""
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        self.assertEqual(
+            Timeline.objects.filter(
+                user=self.reader, post__author=self.star
+            ).count(),
+            3
+        )
+        self.assertFalse(
+            Post.objects.filter(author=self.star, fanned_out=False).exists()
+        )
@@ -1,7 +1,9 @@
+import hashlib
 import shutil
 import tempfile
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
@@ -43,6 +45,7 @@ class PostFormTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         self.authorized_client_2 = Client()
@@ -64,6 +67,10 @@ class PostFormTests(TestCase):
             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
             b'\x0A\x00\x3B'
         )
+        # картинки хранятся под sha256 содержимого
+        self.image_name = (
+            f'posts/{hashlib.sha256(self.small_gif).hexdigest()}.gif'
+        )
         self.uploaded_1 = SimpleUploadedFile(
             name='small.gif',
             content=self.small_gif,
@@ -104,7 +111,7 @@ class PostFormTests(TestCase):
                 pk=last_post.pk,
                 text=self.form_data['text'],
                 group=self.form_data['group'],
-                image=f'posts/{self.uploaded_1.name}'
+                image=self.image_name
             ).exists()
         )
 
@@ -134,10 +141,7 @@ class PostFormTests(TestCase):
             self.assertRedirects(response, self.redirect_post_detail_page)
             self.assertEqual(self.post.text, edited_post['text'])
             self.assertEqual(self.post.group.id, edited_post['group'])
-            self.assertEqual(
-                self.post.image.name,
-                'posts/' + edited_post['image'].name
-            )
+            self.assertEqual(self.post.image.name, self.image_name)
         else:
             self.assertNotEqual(self.post.text, edited_post['text'])
             self.assertEqual(self.post.group.id, edited_post['group'])
@@ -190,3 +194,20 @@ class PostFormTests(TestCase):
                 post=self.post.pk
             ).exists()
         )
+
+    def test_oversized_images_rejected(self):
+        """Слишком большие файлы и картинки не принимаются"""
+        post_count = Post.objects.count()
+        for limits, error in (
+            ({'UPLOAD_MAX_SIZE': 10}, 'Файл больше'),
+            ({'IMAGE_MAX_PIXELS': 1}, 'слишком большая'),
+        ):
+            with self.subTest(limits=limits), self.settings(**limits):
+                self.uploaded_1.seek(0)
+                response = self.authorized_client.post(
+                    reverse('posts:post_create'), data=self.form_data
+                )
+                errors = response.context['form'].errors['image']
+                self.assertEqual(len(errors), 1)
+                self.assertIn(error, errors[0])
+        self.assertEqual(Post.objects.count(), post_count)
@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 
+from .. import triggers
+from ..checks import triggers_check
 from ..models import Group, Post
 
 User = get_user_model()
@@ -71,3 +74,22 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value
                 )
+
+
+class TriggersTest(TestCase):
+    def test_all_triggers_exist(self):
+        """после миграций в базе есть все триггеры из posts.triggers"""
+        self.assertEqual(triggers.missing(connection), [])
+        self.assertEqual(triggers_check(None), [])
+
+    def test_missing_trigger_reported(self):
+        """пропавший триггер попадает в предупреждение posts.W001"""
+        with connection.cursor() as cursor:
+            cursor.execute(triggers.drop_sql(triggers.COMMENT_PATH)[0])
+        try:
+            warnings = triggers_check(None)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(triggers.create_sql(triggers.COMMENT_PATH)[0])
+        self.assertEqual([w.id for w in warnings], ['posts.W001'])
+        self.assertIn(triggers.COMMENT_PATH, warnings[0].msg)
@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.query_budget import budget_exceeded
+from posts.feed import post_keys
+from posts.loader import load_page
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+LISTING_TABLES = ('posts_post', 'posts_comment', 'posts_timeline')
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def is_full_scan(step):
+    """Полный проход по таблице постов или сортировка во временном B-дереве"""
+    if 'TEMP B-TREE FOR ORDER BY' in step:
+        return True
+    return step.startswith('SCAN') and 'INDEX' not in step and any(
+        table in step for table in LISTING_TABLES
+    )
+
+
+class ListingQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User1')
+        cls.author = User.objects.create_user(username='User2')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-group',
+            description='Тестовое описание группы'
+        )
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=f'Тестовый текст поста {i}',
+                author=cls.author,
+                group=cls.group
+            )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Тестовый комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_listing_views_use_indexes(self):
+        """Запросы лент и комментариев идут по индексам без сортировки"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(url)
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or not any(
+                    table in sql for table in LISTING_TABLES
+                ):
+                    continue
+                with self.subTest(url=url, sql=sql):
+                    plan = query_plan(sql)
+                    self.assertFalse(
+                        any(is_full_scan(step) for step in plan), plan
+                    )
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User1')
+        for i in range(12):
+            author = User.objects.create_user(username=f'Author{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='Описание'
+            )
+            Follow.objects.create(user=cls.user, author=author)
+            cls.post = Post.objects.create(
+                text=f'Пост {i} #тег', author=author, group=group
+            )
+            Comment.objects.create(
+                post=cls.post, author=author, text='Комментарий'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_views_within_budget(self):
+        """Страницы укладываются в QUERY_BUDGETS и не делают N+1."""
+        exceeded = []
+
+        def collect(sender, view_name, problems, **kwargs):
+            exceeded.append((view_name, problems))
+
+        budget_exceeded.connect(collect)
+        self.addCleanup(budget_exceeded.disconnect, collect)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group-0'}),
+            reverse('posts:profile', kwargs={'username': 'Author0'}),
+            reverse('posts:follow_index'),
+            reverse('posts:tag_posts', kwargs={'name': 'тег'}),
+            reverse('posts:search') + '?q=пост',
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:autocomplete') + '?q=a',
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        self.assertEqual(exceeded, [])
+
+    def test_page_loaded_in_fixed_queries(self):
+        """Страница любого размера: ключи и один запрос загрузчика."""
+        for size in (3, 10):
+            page = Paginator(post_keys(Post.objects.all()), size).page(1)
+            with self.assertNumQueries(0):
+                load_page(page)
+            with self.assertNumQueries(2):
+                for post in page:
+                    post.author.get_full_name()
+                    post.group.slug
+            self.assertEqual(len(page), size)
+
+    def test_cached_fragment_skips_loading(self):
+        """Если лента главной взята из кеша фрагментов, посты не грузятся."""
+        self.client.get(reverse('posts:index'))
+        # другой адрес: мимо кеша страниц, но тот же фрагмент
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'), {'utm': 'mail'})
+        self.assertFalse([
+            query for query in queries
+            if '"posts_post"."text"' in query['sql']
+        ])
@@ -0,0 +1,91 @@
+from urllib.parse import quote
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.search import SearchResults
+
+from .test_queries import query_plan
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User1')
+        cls.post = Post.objects.create(
+            text='Заметки о ёжиках и барсуках', author=cls.user
+        )
+        cls.other_post = Post.objects.create(
+            text='Про барсуков', author=cls.user
+        )
+        Comment.objects.create(
+            post=cls.other_post, author=cls.user, text='Видел ёжика в лесу'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def search(self, query):
+        return list(SearchResults(query)[0:10])
+
+    def test_post_and_comment_text_found(self):
+        """Пост находится по своему тексту и по тексту комментария."""
+        self.assertEqual(self.search('заметки'), [self.post])
+        self.assertEqual(self.search('лесу'), [self.other_post])
+        self.assertCountEqual(
+            self.search('ёжик'), [self.post, self.other_post]
+        )
+        self.assertEqual(self.search('"OR'), [])
+
+    def test_index_follows_changes(self):
+        """Триггеры обновляют индекс при правке и удалении."""
+        Post.objects.filter(pk=self.post.pk).update(text='Про кротов')
+        self.assertEqual(self.search('кротов'), [self.post])
+        self.assertEqual(self.search('заметки'), [])
+        Comment.objects.all().delete()
+        self.assertEqual(self.search('лесу'), [])
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(self.search('кротов'), [])
+
+    def test_ranked_and_paginated(self):
+        """Более релевантные посты идут первыми, страницы по номерам."""
+        self.assertEqual(self.search('барсук'), [self.other_post, self.post])
+        with override_settings(PAGE_COUNT=1):
+            response = self.client.get(
+                reverse('posts:search'), {'q': 'барсук', 'page': 2}
+            )
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 2)
+        self.assertEqual(len(page_obj), 1)
+        self.assertContains(
+            response, f'?q={quote("барсук")}&amp;page=1'
+        )
+
+    def test_search_uses_fts_index(self):
+        """Поиск читает индекс FTS5, а не перебирает таблицы."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:search'), {'q': 'барсук'})
+        searches = [
+            query['sql'] for query in queries.captured_queries
+            if 'MATCH' in query['sql']
+        ]
+        self.assertEqual(len(searches), 2)
+        for sql in searches:
+            with self.subTest(sql=sql):
+                plan = query_plan(sql)
+                self.assertTrue(
+                    any('VIRTUAL TABLE INDEX' in step for step in plan), plan
+                )
+                self.assertFalse(
+                    any(step.startswith('SCAN') and 'VIRTUAL' not in step
+                        and 'posts_' in step for step in plan), plan
+                )
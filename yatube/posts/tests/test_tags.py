@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, Tag
+from posts.tags import extract_tags
+from posts.utils import encode_cursor
+
+from .test_queries import is_full_scan, query_plan
+
+User = get_user_model()
+
+
+class TagTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User1')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tag_names(self, post):
+        return set(post.tag_entries.values_list('tag__name', flat=True))
+
+    def test_extract_tags(self):
+        """Теги без повторов, в нижнем регистре, не из середины слов."""
+        self.assertEqual(
+            extract_tags('#Кот и #кот, #dog_2 a#b ##x'),
+            ['кот', 'dog_2', 'x']
+        )
+
+    def test_tags_indexed_on_create_and_edit(self):
+        """Создание и правка поста обновляют индекс и счётчики тегов."""
+        self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Про #котов и #собак'}
+        )
+        post = Post.objects.get()
+        self.assertEqual(self.tag_names(post), {'котов', 'собак'})
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Только #собак и #птиц'}
+        )
+        self.assertEqual(self.tag_names(post), {'собак', 'птиц'})
+        self.assertEqual(
+            dict(Tag.objects.values_list('name', 'post_count')),
+            {'котов': 0, 'собак': 1, 'птиц': 1}
+        )
+        post.delete()
+        self.assertEqual(
+            set(Tag.objects.values_list('post_count', flat=True)), {0}
+        )
+
+    def test_tag_page(self):
+        """Страница тега листается курсорами, теги в тексте — ссылки."""
+        for i in range(13):
+            Post.objects.create(text=f'Пост {i} #тест', author=self.user)
+        Post.objects.create(text='Пост без тегов', author=self.user)
+        url = reverse('posts:tag_posts', kwargs={'name': 'тест'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 13)
+        self.assertEqual(len(page_obj), 10)
+        self.assertEqual(page_obj[0].text, 'Пост 12 #тест')
+        self.assertContains(response, f'<a href="{url}">#тест</a>')
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if 'posts_taggedpost' in sql and sql.startswith('SELECT'):
+                with self.subTest(sql=sql):
+                    plan = query_plan(sql)
+                    self.assertFalse(
+                        any(is_full_scan(step) for step in plan), plan
+                    )
+                    self.assertFalse(
+                        any('SCAN posts_taggedpost' in step
+                            and 'INDEX' not in step for step in plan), plan
+                    )
+        response = self.authorized_client.get(
+            url, {'after': encode_cursor(page_obj[9])}
+        )
+        self.assertEqual(len(response.context['page_obj']), 3)
+        self.assertEqual(
+            self.authorized_client.get(
+                reverse('posts:tag_posts', kwargs={'name': 'нет'})
+            ).status_code, 404
+        )
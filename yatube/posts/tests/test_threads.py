@@ -0,0 +1,158 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from .test_queries import query_plan
+
+User = get_user_model()
+
+
+@override_settings(COMMENT_THREAD_DEPTH=3)
+class ThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User1')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+        cls.other_post = Post.objects.create(text='Другой', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def reply(self, text, parent=None):
+        data = {'text': text}
+        if parent is not None:
+            data['parent'] = parent.pk
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data
+        )
+        return Comment.objects.get(text=text)
+
+    def test_threads_shown_with_depth_limit(self):
+        """Ветки идут под корнями, слишком глубокие ответы догружаются."""
+        first = self.reply('Корень 1')
+        parent = first
+        for depth in range(1, 5):
+            parent = self.reply(f'Ответ {depth}', parent)
+        self.assertEqual(parent.depth, 4)
+        self.assertTrue(parent.path.startswith(first.path))
+        self.reply('Корень 2')
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            ['Корень 2', 'Корень 1', 'Ответ 1', 'Ответ 2', 'Ответ 3']
+        )
+        self.assertEqual(
+            [comment.more_replies for comment in comments],
+            [False, False, False, False, True]
+        )
+        [branch_sql] = [
+            query['sql'] for query in queries.captured_queries
+            if '"posts_comment"."path" >=' in query['sql']
+        ]
+        self.assertTrue(
+            any('comment_post_path_idx' in step
+                for step in query_plan(branch_sql))
+        )
+        response = self.authorized_client.get(reverse(
+            'posts:comment_thread',
+            kwargs={'post_id': self.post.pk, 'comment_id': comments[-1].pk}
+        ))
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Ответ 4']
+        )
+
+    def test_reply_form_and_foreign_parent(self):
+        """Форма отвечает на выбранный комментарий только этого поста."""
+        comment = self.reply('Корень')
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            {'reply_to': comment.pk}
+        )
+        self.assertContains(
+            response, f'name="parent" value="{comment.pk}"'
+        )
+        foreign = Comment.objects.create(
+            post=self.other_post, author=self.user, text='Чужой'
+        )
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Не туда', 'parent': foreign.pk}
+        )
+        self.assertFalse(Comment.objects.filter(text='Не туда').exists())
+
+    def test_path_set_without_signals(self):
+        """Путь и глубину комментария, вставленного без сигналов, пишет
+        база.
+        """
+        root = self.reply('Корень')
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text='Ещё корень'),
+            Comment(
+                post=self.post, author=self.user, text='Ответ', parent=root
+            ),
+        ])
+        other = Comment.objects.get(text='Ещё корень')
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(other.path, f'{other.pk:08x}')
+        self.assertEqual(other.depth, 0)
+        self.assertEqual(reply.path, f'{root.path}{reply.pk:08x}')
+        self.assertEqual(reply.depth, 1)
+
+    @override_settings(COMMENT_REPLY_LIMIT=200)
+    def test_replies_read_with_limit(self):
+        """Ответы читаются не больше COMMENT_REPLY_LIMIT за раз: ветки,
+        не уместившиеся на странице, догружаются частями.
+        """
+        self.reply('Пустой корень')
+        old = self.reply('Старый корень')
+        self.reply('Ответ старому', old)
+        big = self.reply('Большой корень')
+        Comment.objects.bulk_create([
+            Comment(
+                post=self.post, author=self.user, text=f'Ответ {number}',
+                parent=big
+            )
+            for number in range(500)
+        ])
+        new = self.reply('Новый корень')
+        self.reply('Ответ новому', new)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            [(comment.text, comment.more_replies) for comment in comments],
+            [
+                ('Новый корень', False),
+                ('Ответ новому', False),
+                ('Большой корень', True),
+                ('Старый корень', True),
+                ('Пустой корень', False),
+            ]
+        )
+        url = reverse(
+            'posts:comment_thread',
+            kwargs={'post_id': self.post.pk, 'comment_id': big.pk}
+        )
+        texts = []
+        while url:
+            response = self.authorized_client.get(url)
+            self.assertLessEqual(len(response.context['comments']), 200)
+            texts += [
+                comment.text for comment in response.context['comments']
+            ]
+            url = response.context['more_url']
+        self.assertEqual(texts, [f'Ответ {number}' for number in range(500)])
@@ -0,0 +1,240 @@
+import shutil
+import tempfile
+from concurrent.futures import Future
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.images import DummyImageFile
+
+from core.cache import bump_generation
+from posts import kvstore, thumbnails
+from posts.models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class InlineExecutor:
+    """Выполняет задачу сразу, в текущем процессе."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        if fn is thumbnails.render:
+            self.submitted.append(args)
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User1')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.cache.clear()
+        default.kvstore.local.clear()
+        self.executor = InlineExecutor()
+        patchers = (
+            mock.patch.object(
+                thumbnails, 'executor', return_value=self.executor
+            ),
+            mock.patch.object(
+                thumbnails.transaction, 'on_commit', lambda func: func()
+            ),
+            mock.patch.object(thumbnails, 'connections'),
+        )
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_thumbnails_rendered_in_background(self):
+        """Все размеры заказываются при сохранении поста и затем
+        отдаются из kvstore без повторной отрисовки.
+        """
+        post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        sizes_count = len(settings.THUMBNAIL_SIZES)
+        self.assertEqual(len(self.executor.submitted), sizes_count)
+        for thumbnail in thumbnails.get_thumbnails(post.image):
+            self.assertNotIsInstance(thumbnail, DummyImageFile)
+            self.assertTrue(thumbnail.exists())
+        self.assertEqual(len(self.executor.submitted), sizes_count)
+        updated = post.updated
+        post.refresh_from_db()
+        self.assertEqual(post.updated, updated)
+        self.assertEqual(post.image_version, 1)
+        self.assertTrue(post.placeholder.startswith('data:image/jpeg'))
+        html = Template(
+            '{% load post_images %}{% post_image post %}'
+        ).render(Context({'post': post}))
+        self.assertIn(post.placeholder, html)
+        self.assertEqual(html.count(' 960w'), 1)
+        self.assertIn(' 480w', html)
+
+    @override_settings(THUMBNAIL_FORMATS=('PNG',))
+    def test_caches_reset_once_per_upload(self):
+        """Кеши сбрасываются один раз, когда готовы все задачи картинки."""
+        with mock.patch.object(thumbnails, 'bump_generation') as bump:
+            post = Post.objects.create(
+                text='Тестовый пост',
+                author=self.user,
+                image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+            )
+        self.assertEqual(
+            len(self.executor.submitted), 2 * len(settings.THUMBNAIL_SIZES)
+        )
+        bump.assert_called_once_with('index')
+        post.refresh_from_db()
+        self.assertEqual(post.image_version, 1)
+        self.assertFalse(thumbnails._outstanding)
+
+    def test_placeholder_until_ready(self):
+        """Пока миниатюры нет, в запросе отдаётся заглушка."""
+        post = Post.objects.create(text='Тестовый пост', author=self.user)
+        Post.objects.filter(pk=post.pk).update(image='posts/small.gif')
+        post.refresh_from_db()
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            for thumbnail in thumbnails.get_thumbnails(post.image):
+                self.assertIsInstance(thumbnail, DummyImageFile)
+        self.assertEqual(
+            schedule.call_count, len(settings.THUMBNAIL_SIZES)
+        )
+
+    @override_settings(THUMBNAIL_FORMATS=('NOSUCHFORMAT', 'PNG'))
+    def test_extra_formats_in_picture(self):
+        """Дополнительные форматы рисуются и попадают в <source>,
+        неизвестные Pillow пропускаются.
+        """
+        post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        self.assertEqual(
+            len(self.executor.submitted), 2 * len(settings.THUMBNAIL_SIZES)
+        )
+        html = Template(
+            '{% load post_images %}{% post_image post %}'
+        ).render(Context({'post': post}))
+        self.assertIn('<source type="image/png"', html)
+        self.assertIn('.png 960w', html)
+
+    def test_image_released_with_last_reference(self):
+        """Общая картинка удаляется только вместе с последним постом."""
+        posts = [
+            Post.objects.create(
+                text='Тестовый пост',
+                author=self.user,
+                image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif')
+            )
+            for name in ('small.gif', 'copy.gif')
+        ]
+        image = posts[0].image
+        self.assertEqual(image.name, posts[1].image.name)
+        posts[1].refresh_from_db()
+        self.assertTrue(posts[1].placeholder.startswith('data:image/jpeg'))
+        self.assertEqual(
+            len(self.executor.submitted), len(settings.THUMBNAIL_SIZES)
+        )
+        thumbnail = thumbnails.get_thumbnails(image)[0]
+        posts[0].delete()
+        self.assertTrue(image.storage.exists(image.name))
+        posts[1].delete()
+        self.assertFalse(image.storage.exists(image.name))
+        self.assertFalse(thumbnail.exists())
+
+    def test_upload_restored_after_concurrent_release(self):
+        """Файл, удалённый release() другого поста до фиксации нового
+        поста с той же картинкой, записывается снова.
+        """
+        Post.objects.create(
+            text='Тестовый пост',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        callbacks = []
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', callbacks.append
+        ):
+            post = Post.objects.create(
+                text='Тестовый пост',
+                author=self.user,
+                image=SimpleUploadedFile('copy.gif', SMALL_GIF, 'image/gif')
+            )
+        # release() первого поста, ещё не видевший второй
+        post.image.storage.delete(post.image.name)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(post.image.storage.exists(post.image.name))
+
+    @override_settings(THUMBNAIL_LRU_CHECK=0)
+    def test_lru_dropped_after_delete_elsewhere(self):
+        """Удаление миниатюр в другом процессе сбрасывает LRU."""
+        post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        thumbnail = thumbnails.get_thumbnails(post.image)[0]
+        self.assertTrue(default.kvstore.local)
+        # другой процесс удалил описания из общего кеша
+        default.kvstore.cache.clear()
+        bump_generation(kvstore.GENERATION, default.kvstore.cache)
+        with mock.patch.object(thumbnails, 'schedule'):
+            self.assertIsInstance(
+                thumbnails.get_thumbnails(post.image)[0], DummyImageFile
+            )
+        self.assertTrue(thumbnail.exists())
+
+    def test_page_metadata_prefetched(self):
+        """Описания миниатюр страницы читаются из кеша одним запросом."""
+        posts = [
+            Post.objects.create(
+                text='Тестовый пост',
+                author=self.user,
+                image=SimpleUploadedFile(
+                    'small.gif', SMALL_GIF + bytes([i]), 'image/gif'
+                )
+            )
+            for i in range(3)
+        ]
+        default.kvstore.local.clear()
+        store = default.kvstore.cache
+        with mock.patch.object(
+            store, 'get_many', wraps=store.get_many
+        ) as get_many:
+            thumbnails.prefetch(post.image for post in posts)
+        get_many.assert_called_once()
+        with mock.patch.object(store, 'get', wraps=store.get) as get:
+            for post in posts:
+                for thumbnail in thumbnails.get_thumbnails(post.image):
+                    self.assertNotIsInstance(thumbnail, DummyImageFile)
+        get.assert_not_called()
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.utils import decode_cursor, encode_cursor, paginate
+from yatube.settings import PAGE_COUNT
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User1')
+        for i in range(PAGE_COUNT * 2 + 3):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+        cls.posts = list(Post.objects.all())
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_round_trip(self):
+        """Курсор однозначно восстанавливает дату и pk поста"""
+        post = self.posts[0]
+        self.assertEqual(
+            decode_cursor(encode_cursor(post)), (post.pub_date, post.pk)
+        )
+        self.assertIsNone(decode_cursor('испорченный'))
+
+    def test_after_and_before_pages(self):
+        """Страницы по курсору совпадают со страницами по номеру"""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        after = encode_cursor(self.posts[PAGE_COUNT - 1])
+        response = self.client.get(url, {'after': after})
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            list(page_obj), self.posts[PAGE_COUNT:PAGE_COUNT * 2]
+        )
+        self.assertTrue(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+        before = encode_cursor(self.posts[PAGE_COUNT])
+        response = self.client.get(url, {'before': before})
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), self.posts[:PAGE_COUNT])
+        self.assertFalse(page_obj.has_previous())
+
+    def test_cursor_page_runs_no_count(self):
+        """Страница по курсору выбирается одним запросом без COUNT"""
+        after = encode_cursor(self.posts[PAGE_COUNT * 2 - 1])
+        request = RequestFactory().get('/', {'after': after})
+        with self.assertNumQueries(1):
+            page_obj = paginate(request, Post.objects.all())
+            self.assertFalse(page_obj.has_next())
+        self.assertEqual(list(page_obj), self.posts[PAGE_COUNT * 2:])
+
+    def test_cursor_out_of_range(self):
+        """Курсор за краем ленты отдаёт первую страницу"""
+        oldest, newest = self.posts[-1], self.posts[0]
+        outside = {
+            'after': encode_cursor(
+                Post(pk=oldest.pk, pub_date=oldest.pub_date)
+            ),
+            'before': encode_cursor(
+                Post(pk=newest.pk + 1, pub_date=newest.pub_date)
+            ),
+        }
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            for direction, cursor in outside.items():
+                with self.subTest(url=url, direction=direction):
+                    response = self.client.get(url, {direction: cursor})
+                    self.assertEqual(response.status_code, 200)
+                    page_obj = response.context['page_obj']
+                    self.assertFalse(page_obj.has_previous())
+                    self.assertEqual(
+                        list(page_obj), self.posts[:PAGE_COUNT]
+                    )
+
+    def test_first_page_runs_no_count(self):
+        """Первая страница ленты — тоже окно по ключу, без COUNT и OFFSET"""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page': 3})
+        self.assertFalse([
+            query for query in queries
+            if 'COUNT(' in query['sql'] or 'OFFSET' in query['sql']
+        ])
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), self.posts[:PAGE_COUNT])
+        self.assertTrue(page_obj.has_next())
+        self.assertNotContains(response, 'page=')
@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import view_counts
+from posts.models import Post
+
+User = get_user_model()
+
+
+def writes(queries):
+    return [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith('UPDATE')
+    ]
+
+
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User1')
+        cls.posts = [
+            Post.objects.create(text=f'Тестовый пост {i}', author=cls.user)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        view_counts._pending.clear()
+        patcher = mock.patch.object(view_counts, 'start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = Client()
+
+    def view(self, post, times=1):
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        for _ in range(times):
+            response = self.client.get(url)
+        return response
+
+    def test_views_buffered_until_flush(self):
+        """Просмотры копятся в памяти, в том числе из кеша страниц."""
+        with CaptureQueriesContext(connection) as queries:
+            self.view(self.posts[0], 3)
+        self.assertEqual(writes(queries), [])
+        self.assertEqual(view_counts.pending(self.posts[0].pk), 3)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).views, 0
+        )
+        self.assertContains(self.view(self.posts[0]), 'Просмотров: <span>3')
+        self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 0})
+        )
+        self.assertEqual(view_counts.pending(0), 0)
+
+    def test_flush_batches_updates(self):
+        """Сброс пишет одной транзакцией по UPDATE на приращение."""
+        self.view(self.posts[0], 2)
+        self.view(self.posts[1], 2)
+        self.view(self.posts[2], 1)
+        with CaptureQueriesContext(connection) as queries:
+            view_counts.flush()
+        self.assertEqual(len(writes(queries)), 2)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('views', flat=True)),
+            [2, 2, 1]
+        )
+        with self.assertNumQueries(0):
+            view_counts.flush()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Просмотров: 2', count=2)
+
+    def test_flush_keeps_cards_cached(self):
+        """Сброс просмотров не вытесняет карточки постов из кеша."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        self.client.get(url)
+        Post.objects.filter(pk=self.posts[0].pk).update(text='Без сигналов')
+        self.view(self.posts[0], 2)
+        view_counts.flush()
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Без сигналов')
+        self.assertContains(response, 'Просмотров: 2', count=1)
+
+    def test_cached_page_served_without_queries(self):
+        """Страница из кеша выводит просмотры без запросов к базе, а
+        сброс этого процесса не уменьшает выведенное число.
+        """
+        self.view(self.posts[0])
+        with self.assertNumQueries(0):
+            response = self.view(self.posts[0])
+        self.assertContains(response, 'Просмотров: <span>1')
+        view_counts.flush()
+        with self.assertNumQueries(0):
+            response = self.view(self.posts[0])
+        self.assertContains(response, 'Просмотров: <span>2')
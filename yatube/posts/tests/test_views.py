@@ -1,14 +1,17 @@
 import shutil
 import tempfile
+import time
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from posts.models import Comment, Follow, Group, Post
+from posts.utils import COMMENT_KEYSET_FIELDS, encode_cursor
 from yatube.settings import PAGE_COUNT
 
 User = get_user_model()
@@ -76,6 +79,7 @@ class PostsPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user_1)
         self.another_authorized_client = Client()
@@ -139,13 +143,22 @@ class PostsPagesTests(TestCase):
                 post_image_0 = first_object.image
                 self.assertEqual(post_image_0, self.post_2.image)
 
+    def get_last_page(self, client, url):
+        """Последняя страница ленты: по ссылкам «Следующая» с курсором."""
+        cache.clear()
+        response = client.get(url)
+        while response.context['page_obj'].has_next():
+            response = client.get(
+                url, {'after': encode_cursor(response.context['page_obj'][-1])}
+            )
+        return response
+
     def test_index__page_show_correct_context_and_paginate(self):
         """Шаблон index сформирован с правильным контекстом"""
         posts_cnt = Post.objects.count()
-        last_page_num = int((posts_cnt / self.padgination_const) + 1)
         response = self.authorized_client.get(reverse('posts:index'))
-        response_last_page = self.authorized_client.get(
-            reverse('posts:index') + '?page=' + str(last_page_num)
+        response_last_page = self.get_last_page(
+            self.authorized_client, reverse('posts:index')
         )
         last_page_posts_cnt = (
             posts_cnt % response.context['page_obj'].paginator.per_page
@@ -161,14 +174,12 @@ class PostsPagesTests(TestCase):
     def test_group_list_page_show_correct_contextand_paginate(self):
         """Шаблон group_list сформирован с правильным контекстом"""
         posts_cnt = Post.objects.filter(group=self.group_2).count()
-        last_page_num = int((posts_cnt / self.padgination_const) + 1)
         response = self.authorized_client.get(
             reverse('posts:group_list', kwargs={'slug': self.group_2.slug})
         )
-        response_last_page = self.client.get(
-            reverse(
-                ('posts:group_list'), kwargs={'slug': self.group_2.slug}
-            ) + '?page=' + str(last_page_num)
+        response_last_page = self.get_last_page(
+            self.client,
+            reverse(('posts:group_list'), kwargs={'slug': self.group_2.slug})
         )
         last_page_posts_cnt = (
             posts_cnt % response.context['page_obj'].paginator.per_page
@@ -190,14 +201,12 @@ class PostsPagesTests(TestCase):
     def test_profile_page_show_correct_contextand_paginate(self):
         """Шаблон profie сформирован с правильным контекстом"""
         posts_cnt = Post.objects.filter(author=self.user_2).count()
-        last_page_num = int((posts_cnt / self.padgination_const) + 1)
         response = self.client.get(
             reverse(('posts:profile'), kwargs={'username': self.user_2})
         )
-        response_last_page = self.client.get(
-            reverse(
-                ('posts:profile'), kwargs={'username': self.user_2}
-            ) + '?page=' + str(last_page_num)
+        response_last_page = self.get_last_page(
+            self.client,
+            reverse(('posts:profile'), kwargs={'username': self.user_2})
         )
         last_page_posts_cnt = (
             posts_cnt % response.context['page_obj'].paginator.per_page
@@ -221,6 +230,43 @@ class PostsPagesTests(TestCase):
         self.check_context_is_correct(response, 'post', False)
         self.assertEqual(comment, self.comment)
 
+    @override_settings(COMMENT_PAGE_COUNT=10)
+    def test_post_detail_comments_paginated(self):
+        """На странице поста первые комментарии, остальные догружаются."""
+        Comment.objects.bulk_create([
+            Comment(post=self.post_2, author=self.user_1, text=f'Ответ {i}')
+            for i in range(25)
+        ])
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post_2.pk})
+        )
+        texts = [comment.text for comment in response.context['comments']]
+        self.assertEqual(texts, [f'Ответ {i}' for i in range(24, 14, -1)])
+        for expected in (range(14, 4, -1), range(4, -1, -1)):
+            response = self.guest_client.get(response.context['more_url'])
+            self.assertEqual(
+                [comment.text for comment in response.context['comments']],
+                [f'Ответ {i}' for i in expected]
+            )
+        self.assertIsNone(response.context['more_url'])
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_post_comments_not_found(self):
+        """Догрузка комментариев несуществующего поста или по испорченному
+        курсору отвечает 404.
+        """
+        cursor = encode_cursor(self.comment, COMMENT_KEYSET_FIELDS)
+        urls = (
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6})
+            + f'?after={cursor}',
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+            + '?after=испорченный',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+
     def check_template_is_correct(self, response):
         form_fields = {
             'text': forms.fields.CharField,
@@ -244,18 +290,104 @@ class PostsPagesTests(TestCase):
         self.check_template_is_correct(response)
 
     def test_cache_index(self):
-        """Проверка кеширования главной страницы index."""
+        """Главная страница кешируется и сбрасывается при изменении постов."""
         response = self.client.get(reverse('posts:index'))
         content_1 = response.content
-        Post.objects.all().delete()
+        # update() не шлёт сигналов: страница берётся из кеша
+        Post.objects.filter(pk=self.post_2.pk).update(text='Без сигналов')
         response_2 = self.client.get(reverse('posts:index'))
         content_2 = response_2.content
         self.assertEqual(content_1, content_2)
-        cache.clear()
+        Post.objects.all().delete()
         response_3 = self.client.get(reverse('posts:index'))
         content_3 = response_3.content
         self.assertNotEqual(content_1, content_3)
 
+    def test_page_cache_fills_personal_parts(self):
+        """Закешированная страница поста дорисовывается для каждого."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.guest_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        response = self.authorized_client.get(url)
+        self.assertNotContains(response, 'Без сигналов')
+        self.assertContains(response, self.user_1.username)
+        self.assertContains(response, 'редактировать запись')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.another_authorized_client.get(url)
+        self.assertContains(response, self.user_2.username)
+        self.assertNotContains(response, 'редактировать запись')
+        self.assertNotContains(self.guest_client.get(url), 'Добавить')
+        index_url = reverse('posts:index')
+        self.assertNotContains(
+            self.guest_client.get(index_url), 'Избранные авторы'
+        )
+        self.assertContains(
+            self.authorized_client.get(index_url), 'Избранные авторы'
+        )
+
+    def test_conditional_get(self):
+        """Неизменившаяся страница отдаётся ответом 304."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.another_authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        Comment.objects.create(
+            post=self.post, author=self.user_2, text='Новый комментарий'
+        )
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        url = reverse('posts:follow_index')
+        etag = self.authorized_client.get(url)['ETag']
+        Follow.objects.filter(user=self.user_1).delete()
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified_follows_changes(self):
+        """Last-Modified сдвигается после правок, а не только новых постов."""
+        url = reverse('posts:index')
+        modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 304)
+        later = int((time.time() + 5) * 1000)
+        with mock.patch('core.cache.new_generation', return_value=later):
+            post = Post.objects.get(pk=self.post_2.pk)
+            post.text = 'После правки'
+            post.save()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_validators_expire_without_shared_cache(self):
+        """Без общего кеша ETag и Last-Modified живут не дольше кеша
+        страниц: правку в другом процессе поколения здесь не покажут.
+        """
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        etag, modified = response['ETag'], response['Last-Modified']
+        later = time.time() + settings.PAGE_CACHE_TIMEOUT
+        with mock.patch('core.page_cache.time.time', return_value=later):
+            for header in (
+                {'HTTP_IF_NONE_MATCH': etag},
+                {'HTTP_IF_MODIFIED_SINCE': modified},
+            ):
+                with self.subTest(header=header):
+                    response = self.client.get(url, **header)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_post_card_cache(self):
+        """Карточка поста кешируется и перерисовывается после правки."""
+        url = reverse('posts:profile', kwargs={'username': self.post_2.author})
+        self.client.get(url)
+        Post.objects.filter(pk=self.post_2.pk).update(text='Без сигналов')
+        self.assertNotContains(self.client.get(url), 'Без сигналов')
+        post = Post.objects.get(pk=self.post_2.pk)
+        post.text = 'После правки'
+        post.save()
+        self.assertContains(self.client.get(url), 'После правки')
+
     def test_following_authorized_only(self):
         """Проверка подписок авторизованным пользователем"""
         # попытка подписки неавторизованным пользователем
@@ -0,0 +1,125 @@
+from django.conf import settings
+
+from .models import Comment
+
+# Ширина сегмента пути: pk в hex фиксированной длины, чтобы строковый
+# порядок путей совпадал с порядком дерева. Та же ширина — в триггере
+# вставки posts_comment_path (миграция 0025).
+SEGMENT_WIDTH = 8
+# Символ больше любой hex-цифры: path + PATH_END — верхняя граница ветки.
+PATH_END = '~'
+MAX_DEPTH = Comment._meta.get_field('path').max_length // SEGMENT_WIDTH - 1
+
+
+def segment(pk):
+    return f'{pk:0{SEGMENT_WIDTH}x}'
+
+
+def place(comment):
+    """Глубина нового ответа; слишком глубокий ответ становится
+    соседом родителя.
+    """
+    parent = comment.parent
+    if parent is not None and parent.depth >= MAX_DEPTH:
+        comment.parent = parent = parent.parent
+    comment.depth = parent.depth + 1 if parent is not None else 0
+
+
+def assign_path(comment):
+    """Путь известен только после вставки: в нём pk комментария.
+
+    В базу его пишет триггер вставки, здесь он повторяется на объекте.
+    """
+    prefix = comment.parent.path if comment.parent_id else ''
+    comment.path = prefix + segment(comment.pk)
+
+
+def branch(post_id, low, high, max_depth):
+    """Комментарии с путями от low до ветки high включительно и глубиной
+    не больше max_depth — один диапазонный запрос по (post, path).
+    """
+    return Comment.objects.filter(
+        post=post_id,
+        path__gte=low,
+        path__lt=high + PATH_END,
+        depth__lte=max_depth
+    ).select_related('author').order_by('path')
+
+
+def thread(roots, replies, depth, cut=()):
+    """Ветки корней roots в порядке показа.
+
+    replies — ответы в порядке путей не глубже depth + 1 уровней от
+    корней: последний уровень не показывается, а только отмечает
+    у родителей more_replies. cut — пути корней, ответы которых
+    не прочитаны и догружаются отдельно.
+    """
+    base = roots[0].depth if roots else 0
+    root_width = (base + 1) * SEGMENT_WIDTH
+    branches = {root.path: [root] for root in roots}
+    hidden = set(cut)
+    for reply in replies:
+        if reply.depth > base + depth:
+            hidden.add(reply.path[:-SEGMENT_WIDTH])
+        elif reply.path[:root_width] in branches:
+            branches[reply.path[:root_width]].append(reply)
+    comments = [comment for root in roots for comment in branches[root.path]]
+    for comment in comments:
+        comment.more_replies = comment.path in hidden
+    return comments
+
+
+def page_threads(post_id, roots):
+    """Страница корневых комментариев с ответами: одним запросом ветки
+    всех корней страницы, от самого позднего до самого раннего.
+
+    Читается не больше COMMENT_REPLY_LIMIT ответов. Ветка, которая
+    не уместилась целиком, и более ранние не показываются, а отмечаются
+    more_replies, если в них есть ответы.
+    """
+    if not roots:
+        return []
+    depth = settings.COMMENT_THREAD_DEPTH
+    limit = settings.COMMENT_REPLY_LIMIT
+    paths = [root.path for root in roots]
+    replies = list(
+        branch(post_id, min(paths), max(paths), depth + 1).filter(
+            depth__gt=0
+        ).order_by('-path')[:limit + 1]
+    )
+    cut = set()
+    if len(replies) > limit:
+        cut_path = replies.pop().path[:SEGMENT_WIDTH]
+        replies = [
+            reply for reply in replies if reply.path > cut_path + PATH_END
+        ]
+        earlier = {
+            root.pk: root.path for root in roots if root.path < cut_path
+        }
+        cut = {cut_path} | {
+            earlier[pk] for pk in Comment.objects.filter(
+                parent__in=list(earlier)
+            ).values_list('parent_id', flat=True).distinct()
+        }
+    replies.reverse()
+    return thread(roots, replies, depth, cut)
+
+
+def subtree(comment, after=''):
+    """Ответы на комментарий на COMMENT_THREAD_DEPTH уровней вниз,
+    не больше COMMENT_REPLY_LIMIT с пути после after.
+
+    Второе значение — путь, после которого читать дальше, или None,
+    если ответы кончились.
+    """
+    depth = settings.COMMENT_THREAD_DEPTH
+    limit = settings.COMMENT_REPLY_LIMIT
+    replies = list(branch(
+        comment.post_id, comment.path, comment.path,
+        comment.depth + depth + 1
+    ).filter(path__gt=max(after, comment.path))[:limit + 1])
+    shown, rest = replies[:limit], replies[limit:]
+    # первый непрочитанный ответ может быть скрытым уровнем показанного
+    marks = [reply for reply in rest if reply.depth > comment.depth + depth]
+    comments = thread([comment], shown + marks, depth)[1:]
+    return comments, shown[-1].path if rest else None
@@ -0,0 +1,336 @@
+import base64
+import logging
+import multiprocessing
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+
+import django
+from django.db import connections, transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings, settings
+from sorl.thumbnail.helpers import get_module_class, serialize, tokey
+from sorl.thumbnail.images import DummyImageFile, ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from core.cache import bump_generation
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+# незавершённые задачи процесса по файлам картинок и картинки, для
+# которых среди них есть выполненные
+_outstanding = Counter()
+_changed = set()
+_lock = threading.Lock()
+
+
+def executor():
+    """Пул процессов для PIL; процессы запускаются заново (spawn),
+    чтобы не наследовать соединения с базой.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            )
+    return _executor
+
+
+class AsyncThumbnailBackend(ThumbnailBackend):
+    """Отдаёт готовую миниатюру из kvstore, а отсутствующую заказывает
+    пулу и до её готовности возвращает заглушку.
+    """
+
+    def prepare(self, file_, geometry_string, options):
+        """Источник, итоговые опции и файл миниатюры, как в sorl."""
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return source, options, ImageFile(name, default.storage)
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        # в отличие от sorl, знает расширения всех форматов Pillow (AVIF)
+        key = tokey(source.key, geometry_string, serialize(options))
+        extension = EXTENSIONS.get(options['format'], options['format'])
+        return (
+            f'{settings.THUMBNAIL_PREFIX}{key[:2]}/{key[2:4]}/{key}.'
+            f'{extension.lower()}'
+        )
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        source, options, thumbnail = self.prepare(
+            file_, geometry_string, options
+        )
+        cached = default.kvstore.get(thumbnail)
+        if cached:
+            return cached
+        schedule(source, geometry_string, options, thumbnail.name)
+        return DummyImageFile(geometry_string)
+
+
+def source_file(name, storage_path):
+    # ключ миниатюры зависит от класса хранилища исходника
+    return ImageFile(name, get_module_class(storage_path)())
+
+
+def enqueue(name, source_name, task, args, done):
+    """Отдаёт task пулу после фиксации транзакции, без повторов по name;
+    done(результат) затем вызывается в родительском процессе.
+    """
+    def submit():
+        with _lock:
+            if name in _pending:
+                return
+            _pending.add(name)
+        task_started(source_name)
+        future = executor().submit(task, *args)
+        future.add_done_callback(partial(finished, name, source_name, done))
+    transaction.on_commit(submit)
+
+
+def finished(name, source_name, done, future):
+    with _lock:
+        _pending.discard(name)
+    try:
+        try:
+            result = future.result()
+        except Exception:
+            logger.exception('Не удалось выполнить фоновую задачу %s', name)
+        else:
+            done(result)
+            with _lock:
+                _changed.add(source_name)
+        task_done(source_name)
+    finally:
+        # колбэк работает в служебном потоке пула
+        connections.close_all()
+
+
+def task_started(source_name):
+    with _lock:
+        _outstanding[source_name] += 1
+
+
+def task_done(source_name):
+    """Когда завершается последняя задача картинки, карточки и страницы
+    её постов сбрасываются один раз, если хоть одна задача выполнена.
+    """
+    with _lock:
+        _outstanding[source_name] -= 1
+        if _outstanding[source_name]:
+            return
+        del _outstanding[source_name]
+        if source_name not in _changed:
+            return
+        _changed.discard(source_name)
+    Post.objects.filter(image=source_name).update(
+        image_version=F('image_version') + 1
+    )
+    bump_generation('index')
+
+
+def schedule(source, geometry_string, options, name):
+    """Заказывает миниатюру name."""
+    source_args = (source.name, source.serialize_storage())
+    enqueue(
+        name, source.name, render, (source_args, geometry_string, options),
+        partial(rendered, source_args, name)
+    )
+
+
+def render(source_args, geometry_string, options):
+    """Работает в процессе пула: читает и пишет только файлы."""
+    backend = AsyncThumbnailBackend()
+    source, options, thumbnail = backend.prepare(
+        source_file(*source_args), geometry_string, options
+    )
+    source_image = default.engine.get_image(source)
+    try:
+        options['image_info'] = default.engine.get_image_info(source_image)
+        source.set_size(default.engine.get_image_size(source_image))
+        backend._create_thumbnail(
+            source_image, geometry_string, options, thumbnail
+        )
+        backend._create_alternative_resolutions(
+            source_image, geometry_string, options, thumbnail.name
+        )
+    finally:
+        default.engine.cleanup(source_image)
+    return source.size, thumbnail.size
+
+
+def rendered(source_args, name, sizes):
+    """Регистрирует готовую миниатюру и сбрасывает страницы с заглушкой."""
+    source_size, size = sizes
+    source = source_file(*source_args)
+    source.set_size(source_size)
+    thumbnail = ImageFile(name, default.storage)
+    thumbnail.set_size(size)
+    default.kvstore.get_or_set(source)
+    default.kvstore.set(thumbnail, source)
+
+
+def placeholder_size():
+    """Размер заглушки: пропорции первой миниатюры, ширина из настроек."""
+    width, height = parse_geometry(settings.THUMBNAIL_SIZES[0])
+    placeholder_width = settings.THUMBNAIL_PLACEHOLDER_WIDTH
+    return placeholder_width, max(1, round(height * placeholder_width / width))
+
+
+def render_placeholder(source_args, size):
+    """Работает в процессе пула: крошечный JPEG картинки как data URI."""
+    source = source_file(*source_args)
+    with source.storage.open(source.name) as file:
+        image = Image.open(file)
+        # JPEG при draft декодируется сразу в уменьшенном виде
+        image.draft('RGB', size)
+        image = ImageOps.fit(image.convert('RGB'), size)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=settings.THUMBNAIL_PLACEHOLDER_QUALITY)
+    return (
+        'data:image/jpeg;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+def placeholder_rendered(source_name, placeholder):
+    Post.objects.filter(image=source_name).update(placeholder=placeholder)
+
+
+def make_placeholder(post):
+    """Заглушка картинки поста: берётся у поста с тем же файлом или
+    заказывается пулу.
+    """
+    placeholder = Post.objects.filter(image=post.image.name).exclude(
+        placeholder=''
+    ).values_list('placeholder', flat=True).first()
+    if placeholder:
+        Post.objects.filter(pk=post.pk).update(placeholder=placeholder)
+        return
+    source_args = (post.image.name, ImageFile(post.image).serialize_storage())
+    enqueue(
+        f'placeholder:{post.image.name}', post.image.name, render_placeholder,
+        (source_args, placeholder_size()),
+        partial(placeholder_rendered, post.image.name)
+    )
+
+
+def extra_formats():
+    """Форматы из THUMBNAIL_FORMATS, которые умеет сохранять Pillow."""
+    Image.init()
+    return [
+        format_ for format_ in settings.THUMBNAIL_FORMATS
+        if format_ in Image.SAVE and format_ in Image.MIME
+    ]
+
+
+def thumbnail_options(format_=None):
+    options = dict(settings.THUMBNAIL_OPTIONS)
+    if format_:
+        options['format'] = format_
+    return options
+
+
+def get_thumbnails(image, format_=None):
+    """Миниатюры картинки всех размеров THUMBNAIL_SIZES; для ещё не
+    готовых заказывается отрисовка и отдаётся заглушка.
+
+    Без format_ формат берётся, как в sorl, по исходному файлу.
+    """
+    return [
+        default.backend.get_thumbnail(
+            image, geometry, **thumbnail_options(format_)
+        )
+        for geometry in settings.THUMBNAIL_SIZES
+    ]
+
+
+def prefetch(images):
+    """Загружает из kvstore описания всех миниатюр картинок сразу."""
+    if not hasattr(default.kvstore, 'prefetch'):
+        return
+    default.kvstore.prefetch([
+        default.backend.prepare(
+            image, geometry, thumbnail_options(format_)
+        )[2]
+        for image in images if image
+        for format_ in [None, *extra_formats()]
+        for geometry in settings.THUMBNAIL_SIZES
+    ])
+
+
+def generate(post):
+    """Заказывает заглушку, все размеры и форматы миниатюр картинки.
+
+    Пока заказ не отдан пулу целиком, он сам держит счётчик задач
+    картинки, чтобы быстрые задачи не сбрасывали кеши по одной.
+    """
+    transaction.on_commit(partial(task_started, post.image.name))
+    if not post.placeholder:
+        make_placeholder(post)
+    for format_ in [None, *extra_formats()]:
+        get_thumbnails(post.image, format_)
+    transaction.on_commit(partial(task_done, post.image.name))
+
+
+def release(name):
+    """Удаляет картинку и её миниатюры, если на неё больше не ссылается
+    ни один пост (одинаковые загрузки хранятся одним файлом).
+    """
+    if not name:
+        return
+    storage = Post._meta.get_field('image').storage
+    source = ImageFile(name, storage)
+
+    def delete():
+        with storage.lock():
+            if Post.objects.filter(image=source.name).exists():
+                return
+            try:
+                default.backend.delete(source)
+            except Exception:
+                logger.exception(
+                    'Не удалось удалить картинку %s', source.name
+                )
+    transaction.on_commit(delete)
+
+
+def keep(post):
+    """Проверяет после фиксации, что файл загрузки поста на месте.
+
+    Хранилище не пишет файл, который уже есть, а release() другого поста
+    с той же картинкой мог не увидеть ещё не зафиксированный пост и
+    удалить файл; тогда он записывается снова из загрузки.
+    """
+    content = getattr(post, 'image_upload', None)
+    if content is None:
+        return
+    storage, name = post.image.storage, post.image.name
+
+    def check():
+        with storage.lock():
+            if not storage.exists(name):
+                content.seek(0)
+                storage.save(name, content)
+    transaction.on_commit(check)
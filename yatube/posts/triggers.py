@@ -0,0 +1,115 @@
+from django.db import migrations
+
+# Триггеры на таблицах постов и комментариев.
+#
+# SQLite при изменении полей (AddField, AlterField и т. п.) пересоздаёт
+# таблицу, и триггеры на ней молча пропадают. Поэтому их SQL собран
+# здесь, а каждая миграция, меняющая posts_post или posts_comment,
+# заканчивается операцией restore() для этой таблицы.
+
+# Посты и комментарии лежат в одном индексе FTS5 posts_search. rowid
+# выводится из первичного ключа (посты — чётные, комментарии —
+# нечётные), поэтому триггеры находят свою строку индекса без перебора.
+SEARCH_POST = (
+    'posts_search_post_insert',
+    'posts_search_post_update',
+    'posts_search_post_delete',
+)
+SEARCH_COMMENT = (
+    'posts_search_comment_insert',
+    'posts_search_comment_update',
+    'posts_search_comment_delete',
+)
+# Путь и глубину нового комментария пишет триггер, а не сигнал, чтобы их
+# не пропускали bulk_create и сырые вставки. Ширина сегмента — 8 hex-цифр,
+# как posts.threads.SEGMENT_WIDTH.
+COMMENT_PATH = 'posts_comment_path'
+
+TRIGGERS = {
+    'posts_search_post_insert': ('posts_post', """
+        AFTER INSERT ON posts_post
+        BEGIN
+            INSERT INTO posts_search (rowid, text, post_id)
+            VALUES (new.id * 2, new.text, new.id);
+        END
+    """),
+    'posts_search_post_update': ('posts_post', """
+        AFTER UPDATE OF text ON posts_post
+        BEGIN
+            UPDATE posts_search SET text = new.text WHERE rowid = new.id * 2;
+        END
+    """),
+    'posts_search_post_delete': ('posts_post', """
+        AFTER DELETE ON posts_post
+        BEGIN
+            DELETE FROM posts_search WHERE rowid = old.id * 2;
+        END
+    """),
+    'posts_search_comment_insert': ('posts_comment', """
+        AFTER INSERT ON posts_comment
+        BEGIN
+            INSERT INTO posts_search (rowid, text, post_id)
+            VALUES (new.id * 2 + 1, new.text, new.post_id);
+        END
+    """),
+    'posts_search_comment_update': ('posts_comment', """
+        AFTER UPDATE OF text, post_id ON posts_comment
+        BEGIN
+            UPDATE posts_search SET text = new.text, post_id = new.post_id
+            WHERE rowid = new.id * 2 + 1;
+        END
+    """),
+    'posts_search_comment_delete': ('posts_comment', """
+        AFTER DELETE ON posts_comment
+        BEGIN
+            DELETE FROM posts_search WHERE rowid = old.id * 2 + 1;
+        END
+    """),
+    COMMENT_PATH: ('posts_comment', """
+        AFTER INSERT ON posts_comment
+        WHEN new.path = ''
+        BEGIN
+            UPDATE posts_comment SET path = COALESCE(
+                (SELECT path FROM posts_comment WHERE id = new.parent_id), ''
+            ) || printf('%08x', new.id)
+            WHERE id = new.id;
+            UPDATE posts_comment SET depth = length(path) / 8 - 1
+            WHERE id = new.id;
+        END
+    """),
+}
+
+
+def create_sql(*names):
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {name} {TRIGGERS[name][1]}'
+        for name in names
+    ]
+
+
+def drop_sql(*names):
+    return [f'DROP TRIGGER IF EXISTS {name}' for name in reversed(names)]
+
+
+def on_table(table):
+    return [name for name, (on, _) in TRIGGERS.items() if on == table]
+
+
+def restore(*tables):
+    """Операция миграции: заново создаёт все триггеры таблиц tables."""
+    names = [name for table in tables for name in on_table(table)]
+    return migrations.RunSQL(create_sql(*names), migrations.RunSQL.noop)
+
+
+def missing(connection):
+    """Триггеры, которых нет в базе, на существующих таблицах."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE type IN ('table', 'trigger')"
+        )
+        existing = {(kind, name) for kind, name in cursor.fetchall()}
+    return [
+        name for name, (table, _) in TRIGGERS.items()
+        if ('table', table) in existing and ('trigger', name) not in existing
+    ]
@@ -1,10 +1,104 @@
-from django.core.paginator import Paginator
+import base64
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 from yatube.settings import PAGE_COUNT
 
+# Поля ключа курсора: дата и первичный ключ для однозначного порядка.
+KEYSET_FIELDS = ('pub_date', 'pk')
+COMMENT_KEYSET_FIELDS = ('created', 'pk')
+
+
+def encode_cursor(obj, fields=KEYSET_FIELDS):
+    """Непрозрачный курсор на запись для ссылок ?after= и ?before=."""
+    date_field, pk_field = fields
+    raw = f'{getattr(obj, date_field).isoformat()}|{getattr(obj, pk_field)}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает пару (дата, pk) из курсора или None, если он испорчен."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        date, pk = raw.decode().split('|')
+        date, pk = parse_datetime(date), int(pk)
+    except ValueError:
+        return None
+    if date is None:
+        return None
+    return date, pk
+
+
+def keyset_window(queryset, after=None, before=None, limit=PAGE_COUNT,
+                  fields=KEYSET_FIELDS):
+    """Выбирает limit записей после курсора after или перед курсором before.
+
+    Записи возвращаются в порядке убывания ключа вместе с признаком того,
+    что в направлении выборки за окном остались ещё записи.
+    """
+    date_field, pk_field = fields
+    cursor = before or after
+    backward = before is not None
+    if cursor is not None:
+        lookup = 'gt' if backward else 'lt'
+        date, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__{lookup}': date})
+            | Q(**{date_field: date, f'{pk_field}__{lookup}': pk})
+        )
+    order = '' if backward else '-'
+    queryset = queryset.order_by(f'{order}{date_field}', f'{order}{pk_field}')
+    objects = list(queryset[:limit + 1])
+    has_more = len(objects) > limit
+    objects = objects[:limit]
+    if backward:
+        objects.reverse()
+    return objects, has_more
+
+
+class KeysetPaginator(Paginator):
+    """Пагинатор по ключу (fields), стоимость не зависит от глубины.
+
+    Страница — обычная Page без номера: есть ли соседние страницы,
+    известно из выборки окна, без COUNT.
+    """
+
+    def __init__(self, object_list, per_page, fields=KEYSET_FIELDS, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.fields = fields
+
+    def keyset_page(self, after=None, before=None):
+        window = getattr(self.object_list, 'keyset_window', None)
+        if window is not None:
+            objects, has_more = window(after, before, self.per_page)
+        else:
+            objects, has_more = keyset_window(
+                self.object_list, after, before, self.per_page, self.fields
+            )
+        if before is not None:
+            return self.page_of(objects, True, has_more)
+        return self.page_of(objects, has_more, after is not None)
+
+    def page_of(self, objects, has_next, has_previous):
+        page = Page(objects, None, self)
+        page.has_next = lambda: has_next
+        page.has_previous = lambda: has_previous
+        return page
+
 
 def paginate(request, object_list, limit=PAGE_COUNT):
-    paginator = Paginator(object_list, limit)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    """Страница ленты после курсора ?after= или перед ?before=, без них —
+    первая. Номеров страниц нет: им нужны COUNT и OFFSET.
+    """
+    after = decode_cursor(request.GET.get('after', ''))
+    before = None
+    if after is None:
+        before = decode_cursor(request.GET.get('before', ''))
+    paginator = KeysetPaginator(object_list, limit)
+    page_obj = paginator.keyset_page(after=after, before=before)
+    # курсор за краем ленты: вместо пустого окна — первая страница
+    if not page_obj.object_list and (after or before):
+        page_obj = paginator.keyset_page()
     return page_obj
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_pending = Counter()
+_lock = threading.Lock()
+_flusher = None
+
+
+def record(post_id):
+    """Запоминает просмотр в памяти процесса; в базу он попадёт при
+    ближайшем сбросе.
+    """
+    with _lock:
+        _pending[post_id] += 1
+    start()
+
+
+def pending(post_id):
+    """Просмотры поста, ещё не записанные в базу этим процессом."""
+    with _lock:
+        return _pending[post_id]
+
+
+def views_key(post_id):
+    return f'post_views:{post_id}'
+
+
+def total(post_id):
+    """Просмотры из базы и ещё не записанные просмотры этого процесса.
+
+    Число из базы кешируется на VIEW_FLUSH_INTERVAL, а сброс этого
+    процесса прибавляет к нему записанное, поэтому просмотр страницы
+    из кеша обходится без запроса.
+    """
+    views = cache.get_or_set(
+        views_key(post_id),
+        lambda: Post.objects.filter(pk=post_id).values_list(
+            'views', flat=True
+        ).first() or 0,
+        settings.VIEW_FLUSH_INTERVAL
+    )
+    return views + pending(post_id)
+
+
+def flush():
+    """Записывает накопленные просмотры одной транзакцией: по UPDATE на
+    каждое различное приращение, а не на каждый пост.
+    """
+    global _pending
+    with _lock:
+        batch, _pending = _pending, Counter()
+    if not batch:
+        return
+    by_delta = defaultdict(list)
+    for post_id, delta in batch.items():
+        by_delta[delta].append(post_id)
+    try:
+        with transaction.atomic():
+            for delta, post_ids in by_delta.items():
+                Post.objects.filter(pk__in=post_ids).update(
+                    views=F('views') + delta
+                )
+    except Exception:
+        # просмотры не теряются, а ждут следующего сброса
+        with _lock:
+            _pending.update(batch)
+        raise
+    for post_id, delta in batch.items():
+        try:
+            cache.incr(views_key(post_id), delta)
+        except ValueError:
+            # числа нет в кеше, оно прочитается из базы
+            pass
+
+
+def run():
+    while True:
+        time.sleep(settings.VIEW_FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.exception('Не удалось записать просмотры')
+        finally:
+            connections.close_all()
+
+
+def start():
+    """Запускает фоновый сброс при первом просмотре в процессе.
+
+    Поток служебный: при остановке процесса теряются просмотры
+    не больше чем за VIEW_FLUSH_INTERVAL.
+    """
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(
+                target=run, name='view-counts', daemon=True
+            )
+            _flusher.start()
+
+
+def counts_view(view):
+    """Считает успешные GET-запросы к view поста, в том числе ответы
+    из кеша страниц и 304.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            record(kwargs['post_id'])
+        return response
+    return wrapper
@@ -1,69 +1,187 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Comment, Post, User
-from .utils import paginate
+from core.cache import generation
+from core.page_cache import cache_page_with_holes, page_condition
+
+from . import autocomplete, threads
+from .feed import follow_feed, post_keys
+from .forms import CommentForm, PostForm, ReplyForm
+from .loader import following, load_page
+from .models import Follow, Group, Comment, Post, Tag, User
+from .search import SearchResults
+from .tags import TagFeed
+from .utils import (
+    COMMENT_KEYSET_FIELDS, decode_cursor, encode_cursor, keyset_window,
+    paginate
+)
+from .view_counts import counts_view
 
 
 follow_index_page = 'posts:follow_index'
 
 
+@page_condition('index')
+@cache_page_with_holes(settings.PAGE_CACHE_TIMEOUT, 'index')
 def index(request):
     template = 'posts/index.html'
-    paginator = paginate(request, Post.objects.select_related('group').all())
+    paginator = paginate(request, post_keys(Post.objects.all()))
     context = {
-        'page_obj': paginator,
-        'index': True
+        'page_obj': load_page(paginator),
+        'index': True,
+        'generation': generation('index'),
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@page_condition('index')
+@cache_page_with_holes(settings.PAGE_CACHE_TIMEOUT, 'index')
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
-    paginator = paginate(request, posts_list)
+    paginator = paginate(request, post_keys(Post.objects.filter(group=group)))
     context = {
         'group': group,
-        'page_obj': paginator,
+        'page_obj': load_page(paginator),
     }
     return render(request, template, context)
 
 
+@page_condition('index')
+@cache_page_with_holes(settings.PAGE_CACHE_TIMEOUT, 'index')
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name)
+    context = {
+        'tag': tag,
+        'page_obj': load_page(paginate(request, TagFeed(tag))),
+    }
+    return render(request, 'posts/tag_list.html', context)
+
+
+@page_condition('index', 'follow:{username}', 'follow:{viewer}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    paginator = paginate(request, Post.objects.filter(author=author))
+    author = get_object_or_404(
+        User.objects.select_related('profile'),
+        username=username
+    )
+    paginator = paginate(
+        request, post_keys(Post.objects.filter(author=author))
+    )
     context = {
         'author': author,
-        'page_obj': paginator,
-        'following': False,
+        'page_obj': load_page(paginator),
+        'following': author.pk in following(request.user, [author.pk]),
     }
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
-        context['following'] = following
-        return render(request, 'posts/profile.html', context)
-    else:
-        return render(request, 'posts/profile.html', context)
+    return render(request, 'posts/profile.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    # результаты идут по релевантности, поэтому страницы — по номерам
+    paginator = Paginator(SearchResults(query), settings.PAGE_COUNT)
+    context = {
+        'query': query,
+        'page_obj': load_page(paginator.get_page(request.GET.get('page'))),
+    }
+    return render(request, 'posts/search.html', context)
+
 
+def suggest(request):
+    # ответ из индекса в памяти процесса, без запросов к базе
+    results = autocomplete.suggest(request.GET.get('q', '').strip())
+    return JsonResponse({'results': results})
 
+
+@counts_view
+@page_condition('index', 'comments:{post_id}')
+@cache_page_with_holes(
+    settings.PAGE_CACHE_TIMEOUT, 'index', 'comments:{post_id}'
+)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'),
+        pk=post_id
+    )
     form = CommentForm(
         request.POST or None
     )
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        **comments_page(post_id),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(post_id, after=None):
+    """Окно из COMMENT_PAGE_COUNT веток комментариев после курсора
+    after и ссылка на следующее окно, если оно есть.
+    """
+    roots, has_more = keyset_window(
+        Comment.objects.filter(post=post_id, depth=0).select_related(
+            'author'
+        ),
+        after=after,
+        limit=settings.COMMENT_PAGE_COUNT,
+        fields=COMMENT_KEYSET_FIELDS
+    )
+    more_url = None
+    if has_more:
+        cursor = encode_cursor(roots[-1], COMMENT_KEYSET_FIELDS)
+        more_url = (
+            f"{reverse('posts:post_comments', args=[post_id])}"
+            f'?after={cursor}'
+        )
+    return {
+        'comments': threads.page_threads(post_id, roots),
+        'more_url': more_url,
+    }
+
+
+@cache_page_with_holes(
+    settings.PAGE_CACHE_TIMEOUT, 'index', 'comments:{post_id}'
+)
+def post_comments(request, post_id):
+    """Фрагмент со следующими комментариями для кнопки «Показать ещё»."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    after = decode_cursor(request.GET.get('after', ''))
+    # курсоры выдаёт сама страница: испорченный не кешируем
+    if after is None:
+        raise Http404('Некорректный курсор комментариев')
+    return render(
+        request, 'posts/includes/comments.html',
+        comments_page(post_id, after)
+    )
+
+
+@cache_page_with_holes(
+    settings.PAGE_CACHE_TIMEOUT, 'index', 'comments:{post_id}'
+)
+def comment_thread(request, post_id, comment_id):
+    """Фрагмент с продолжением ветки, не раскрытой на странице."""
+    comment = get_object_or_404(
+        Comment.objects.select_related('author'), pk=comment_id, post=post_id
+    )
+    after = request.GET.get('after', '')
+    # курсор — путь ответа этой ветки, другие не кешируем
+    if after and not after.startswith(comment.path):
+        raise Http404('Некорректный курсор ветки')
+    comments, cursor = threads.subtree(comment, after)
+    more_url = None
+    if cursor is not None:
+        more_url = (
+            f"{reverse('posts:comment_thread', args=[post_id, comment_id])}"
+            f'?after={cursor}'
+        )
+    context = {'comments': comments, 'more_url': more_url}
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -103,8 +221,10 @@ def post_edit(request, post_id):
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
-    if form.is_valid():
+    reply = ReplyForm(request.POST or None, post=post)
+    if form.is_valid() and reply.is_valid():
         comment = form.save(commit=False)
+        comment.parent = reply.cleaned_data['parent']
         comment.author = request.user
         comment.post = post
         comment.save()
@@ -112,14 +232,12 @@ def add_comment(request, post_id):
 
 
 @login_required
+@page_condition('index', 'follow:{viewer}')
 def follow_index(request):
     template = 'posts/follow.html'
-    follower = request.user
-    paginator = paginate(
-        request, Post.objects.filter(author__following__user=follower)
-    )
+    paginator = paginate(request, follow_feed(request.user))
     context = {
-        'page_obj': paginator,
+        'page_obj': load_page(paginator),
         'follow': True
     }
     return render(request, template, context)
@@ -59,6 +59,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.query_budget.QueryBudgetMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -150,6 +151,40 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 # paginator page count settings
 PAGE_COUNT = 10
+# комментариев на странице поста и в каждой догрузке
+COMMENT_PAGE_COUNT = 20
+# на сколько уровней ответов раскрываются ветки комментариев
+COMMENT_THREAD_DEPTH = 3
+# сколько ответов читается за раз: на странице поста и в догрузке ветки
+COMMENT_REPLY_LIMIT = 200
+
+# с этого числа подписчиков посты автора не раскладываются по лентам,
+# а подмешиваются в ленту подписки при чтении
+FEED_FANOUT_THRESHOLD = 1000
+# столько последних постов автора попадает в ленту при подписке
+FEED_BACKFILL_LIMIT = PAGE_COUNT * 10
+
+# сколько запросов к базе может сделать view (по имени из urls);
+# остальные view не проверяются
+QUERY_BUDGETS = {
+    'posts:index': 8,
+    'posts:group_list': 8,
+    'posts:profile': 8,
+    'posts:follow_index': 8,
+    'posts:tag_posts': 8,
+    'posts:search': 8,
+    'posts:post_detail': 8,
+    'posts:autocomplete': 2,
+}
+# одинаковый с точностью до параметров запрос столько раз за ответ — N+1
+QUERY_REPEAT_LIMIT = 3
+
+# просмотры постов копятся в памяти процесса и пишутся в базу раз в
+# столько секунд одной транзакцией
+VIEW_FLUSH_INTERVAL = 30
+
+# сколько подсказок отдаёт автодополнение
+AUTOCOMPLETE_LIMIT = 10
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -158,13 +193,69 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# миниатюры делаются в фоне пулом процессов, до готовности — заглушка
+THUMBNAIL_BACKEND = 'posts.thumbnails.AsyncThumbnailBackend'
+THUMBNAIL_WORKERS = 2
+# метаданные миниатюр в кеше и LRU процесса, без запросов к базе;
+# LRU сверяется с поколением миниатюр в кеше раз в THUMBNAIL_LRU_CHECK с
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+THUMBNAIL_CACHE = 'thumbnails'
+THUMBNAIL_LRU_SIZE = 10000
+THUMBNAIL_LRU_CHECK = 5
+# размеры миниатюр поста для srcset, первый идёт в src
+THUMBNAIL_SIZES = ('960x339', '480x170', '1920x678')
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+# дополнительные форматы для <picture>; не поддержанные Pillow пропускаются
+THUMBNAIL_FORMATS = ('AVIF', 'WEBP')
+# размытая заглушка, которая встраивается в страницу до загрузки картинки
+THUMBNAIL_PLACEHOLDER_WIDTH = 16
+THUMBNAIL_PLACEHOLDER_QUALITY = 40
+THUMBNAIL_DUMMY_SOURCE = (
+    'data:image/gif;base64,'
+    'R0lGODlhAQABAIAAAP///wAAACH5BAEAAAAALAAAAAABAAEAAAICRAEAOw=='
+)
+
+# загрузки пишутся на диск по частям; больше UPLOAD_MAX_SIZE не сохраняются
+FILE_UPLOAD_HANDLERS = ['core.uploadhandler.BoundedUploadHandler']
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
 # Подключение бэкенда кеширования
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # метаданные миниатюр — единственный список их файлов: кеш общий для
+    # процессов и не вытесняет записи, иначе файлы не удалить. Каждая
+    # запись — файл в одном каталоге, get_many читает по файлу на ключ;
+    # описания миниатюр держит LRU процесса (THUMBNAIL_LRU_SIZE), так что
+    # с диска читаются только карточки, которых нет в кеше default.
+    # Тесты переносят каталог во временный (core.testing).
+    'thumbnails': {
+        'BACKEND': 'core.cache.PersistentFileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'thumbnails'),
+        'TIMEOUT': None,
+    },
 }
 
+# файловые кеши на время тестов переносятся во временный каталог
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Поколения (core.cache.generation), по которым сбрасываются кеши страниц
+# и фрагментов, лежат в кеше default. LocMemCache у каждого процесса свой:
+# запись в одном воркере не сбрасывает кеш остальных, и они отдают старые
+# страницы до конца срока. Долгий срок — только с общим для процессов
+# кешем (Memcached, Redis, файлы).
+SHARED_CACHE = CACHES['default']['BACKEND'] != (
+    'django.core.cache.backends.locmem.LocMemCache'
+)
+# страницы и фрагменты сбрасываются по поколениям, срок ограничивает их
+# число, а без общего кеша — и отставание других процессов
+PAGE_CACHE_TIMEOUT = 60 * 60 if SHARED_CACHE else 20
+# индекс автодополнения в памяти процесса сверяется с поколением в кеше,
+# а без общего кеша о чужих изменениях узнаёт только перестройкой по сроку
+AUTOCOMPLETE_MAX_AGE = 60 * 60 if SHARED_CACHE else 60
+
 # Добавьте IP адреса, при обращении с которых будет доступен DjDT
 INTERNAL_IPS = [
     '127.0.0.1',
@@ -3,6 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import serve_media
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
@@ -16,7 +18,7 @@ handler403 = 'core.views.permission_denied'
 
 if settings.DEBUG:
     urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
+        settings.MEDIA_URL, serve_media, document_root=settings.MEDIA_ROOT
     )
     import debug_toolbar
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),) 